@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Generator of synthetic HEP literature records to benchmark the merger."""
+
+from __future__ import absolute_import, division, print_function
+
+import copy
+import random
+import string
+
+FIRST_NAMES = [
+    u'Alessandro', u'Anna', u'Dmitri', u'Elena', u'Hiroshi', u'Jean-Luc',
+    u'John', u'Kathryn', u'Li', u'Maria', u'Mohammed', u'Pierre', u'Priya',
+    u'Tomás', u'Wei',
+]  # fmt: skip
+LAST_NAME_SYLLABLES = [
+    u'ar', u'bi', u'chen', u'du', u'ga', u'iv', u'jan', u'ko', u'li', u'mül',
+    u'na', u'or', u'pa', u'ri', u'ros', u'sa', u'ti', u'to', u'van', u'wa',
+    u'ya', u'zh',
+]  # fmt: skip
+AFFILIATIONS = ['CERN', 'DESY', 'Fermilab', 'KEK', 'SLAC', 'Warsaw U.', 'INFN, Rome']
+JOURNALS = ['Phys.Rev.D', 'Phys.Rev.Lett.', 'JHEP', 'Eur.Phys.J.C', 'Nucl.Phys.B']
+
+
+def generate_record(
+    rng, authors=10, references=10, documents=2, figures=2, source='arXiv'
+):
+    """Generate a record valid against the ``hep`` schema.
+
+    Args:
+        rng(random.Random): the random generator to use.
+        authors(int): number of authors.
+        references(int): number of references.
+        documents(int): number of documents.
+        figures(int): number of figures.
+        source(str): the acquisition source and the source of the files.
+
+    Returns:
+        dict: the generated record.
+    """
+    eprint = '%04d.%05d' % (rng.randint(1001, 2512), rng.randint(1, 99999))
+    return {
+        '_collections': ['Literature'],
+        'acquisition_source': {'source': source, 'method': 'hepcrawl'},
+        'arxiv_eprints': [{'value': eprint, 'categories': ['hep-ph', 'hep-ex']}],
+        'abstracts': [{'source': source, 'value': _sentence(rng, 60)}],
+        'authors': [_author(rng, idx) for idx in range(authors)],
+        'citeable': True,
+        'control_number': rng.randint(1, 2000000),
+        'document_type': ['article'],
+        'documents': [_file(rng, 'document', idx, source) for idx in range(documents)],
+        'dois': [{'value': '10.1103/PhysRevD.%d.%d' % (rng.randint(1, 110), 1)}],
+        'figures': [_file(rng, 'figure', idx, source) for idx in range(figures)],
+        'number_of_pages': rng.randint(4, 300),
+        'publication_info': [_publication_info(rng)],
+        'references': [_reference(rng) for _ in range(references)],
+        'titles': [{'source': source, 'title': _sentence(rng, 8)}],
+    }
+
+
+def generate_triple(
+    authors=10,
+    references=10,
+    documents=2,
+    figures=2,
+    conflict_density=0.1,
+    seed=0,
+):
+    """Generate a ``(root, head, update)`` triple.
+
+    The head is the root with curator edits, the update is the root with
+    changes from a new harvest. Both edit each author, reference, document,
+    figure and top-level value with probability ``conflict_density``, so that
+    about ``conflict_density ** 2`` of them end up conflicting.
+
+    Returns:
+        tuple: ``(root, head, update)``.
+    """
+    rng = random.Random(seed)
+    root = generate_record(rng, authors, references, documents, figures)
+    head = _edit_record(rng, root, conflict_density)
+    update = _edit_record(rng, root, conflict_density)
+    return root, head, update
+
+
+def _edit_record(rng, record, density):
+    record = copy.deepcopy(record)
+    for author in record['authors']:
+        if rng.random() < density:
+            author['full_name'] = _typo(rng, author['full_name'])
+        if rng.random() < density:
+            author['raw_affiliations'] = [{'value': rng.choice(AFFILIATIONS)}]
+    for reference in record['references']:
+        if rng.random() < density:
+            reference['reference']['title'] = {'title': _sentence(rng, 6)}
+    for field in ('documents', 'figures'):
+        for file_ in record[field]:
+            if rng.random() < density:
+                file_['description' if field == 'documents' else 'caption'] = (
+                    _sentence(rng, 5)
+                )
+    if rng.random() < density:
+        record['titles'][0]['title'] = _sentence(rng, 8)
+    if rng.random() < density:
+        record['publication_info'] = [_publication_info(rng)]
+    if rng.random() < density:
+        record['number_of_pages'] = rng.randint(4, 300)
+    if rng.random() < density:
+        record['authors'].insert(rng.randint(0, len(record['authors'])), _author(rng))
+    return record
+
+
+def _author(rng, idx=None):
+    first, last = rng.choice(FIRST_NAMES), _last_name(rng)
+    author = {
+        'full_name': u'%s, %s' % (last, first),
+        'affiliations': [{'value': rng.choice(AFFILIATIONS)}],
+        'raw_affiliations': [{'value': rng.choice(AFFILIATIONS)}],
+    }
+    if idx is not None and rng.random() < 0.3:
+        author['ids'] = [
+            {
+                'schema': 'INSPIRE BAI',
+                'value': u'%s.%s.%d' % (first[0], last, idx + 1),
+            }
+        ]
+    return author
+
+
+def _reference(rng):
+    reference = {
+        'reference': {
+            'title': {'title': _sentence(rng, 6)},
+            'authors': [{'full_name': u'%s, A.' % _last_name(rng)}],
+            'publication_info': _publication_info(rng),
+            'misc': [_sentence(rng, 3)],
+        },
+        'raw_refs': [{'schema': 'text', 'value': _sentence(rng, 10)}],
+    }
+    if rng.random() < 0.5:
+        reference['reference']['arxiv_eprint'] = '%04d.%05d' % (
+            rng.randint(1001, 2512),
+            rng.randint(1, 99999),
+        )
+    return reference
+
+
+def _file(rng, kind, idx, source):
+    key = '%s%d.%s' % (kind, idx, 'pdf' if kind == 'document' else 'png')
+    file_ = {
+        'key': key,
+        'url': 'http://localhost/files/%s' % key,
+        'source': source,
+    }
+    if kind == 'document':
+        file_['description'] = _sentence(rng, 5)
+    else:
+        file_['caption'] = _sentence(rng, 5)
+    return file_
+
+
+def _publication_info(rng):
+    return {
+        'journal_title': rng.choice(JOURNALS),
+        'journal_volume': str(rng.randint(1, 110)),
+        'artid': str(rng.randint(1, 999999)),
+        'year': rng.randint(1990, 2026),
+    }
+
+
+def _last_name(rng):
+    syllables = (rng.choice(LAST_NAME_SYLLABLES) for _ in range(rng.randint(2, 4)))
+    return ''.join(syllables).capitalize()
+
+
+def _sentence(rng, words):
+    return ' '.join(
+        ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 9)))
+        for _ in range(words)
+    )
+
+
+def _typo(rng, name):
+    idx = rng.randrange(len(name))
+    return name[:idx] + rng.choice(string.ascii_lowercase) + name[idx + 1 :]
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Benchmark ``merge`` on synthetic records for every configuration.
+
+Example:
+    python benchmarks/run.py --authors 10 3000 --output results.json
+    python benchmarks/run.py --authors 10 3000 --baseline results.json
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+
+from records import generate_triple
+
+from inspire_json_merger import config
+from inspire_json_merger.api import merge
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+def get_configurations():
+    """Return all the configuration classes defined in ``config``."""
+    return sorted(
+        (
+            value
+            for value in vars(config).values()
+            if isinstance(value, type)
+            and issubclass(value, config.MergerConfigurationOperations)
+            and value is not config.MergerConfigurationOperations
+        ),
+        key=lambda configuration: configuration.__name__,
+    )
+
+
+def run_case(configuration, params, repeat):
+    """Time ``repeat`` merges of the triple generated from ``params``."""
+    root, head, update = generate_triple(**params)
+    timings = []
+    for _ in range(repeat):
+        start = timer()
+        _, conflicts = merge(root, head, update, configuration=configuration)
+        timings.append(timer() - start)
+    timings.sort()
+    result = dict(params)
+    result.update(
+        {
+            'configuration': configuration.__name__,
+            'conflicts': len(conflicts),
+            'min': timings[0],
+            'median': timings[len(timings) // 2],
+        }
+    )
+    return result
+
+
+def run(args):
+    cases = itertools.product(
+        get_configurations(),
+        args.authors,
+        args.references,
+        args.documents,
+        args.figures,
+        args.conflict_density,
+    )
+    results = []
+    for configuration, authors, references, documents, figures, density in cases:
+        params = {
+            'authors': authors,
+            'references': references,
+            'documents': documents,
+            'figures': figures,
+            'conflict_density': density,
+            'seed': args.seed,
+        }
+        results.append(run_case(configuration, params, args.repeat))
+    return {
+        'python': platform.python_version(),
+        'repeat': args.repeat,
+        'results': results,
+    }
+
+
+def _case_key(result):
+    return tuple(
+        result[key]
+        for key in (
+            'configuration',
+            'authors',
+            'references',
+            'documents',
+            'figures',
+            'conflict_density',
+            'seed',
+        )
+    )
+
+
+def print_report(report, baseline=None):
+    baseline_results = {
+        _case_key(result): result for result in (baseline or {}).get('results', [])
+    }
+    for result in report['results']:
+        line = '%-32s authors=%-5d refs=%-5d density=%-5s median=%.4fs' % (
+            result['configuration'],
+            result['authors'],
+            result['references'],
+            result['conflict_density'],
+            result['median'],
+        )
+        previous = baseline_results.get(_case_key(result))
+        if previous:
+            line += ' (%+.1f%%)' % (
+                100 * (result['median'] - previous['median']) / previous['median']
+            )
+        print(line, file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--authors', type=int, nargs='+', default=[10, 300])
+    parser.add_argument('--references', type=int, nargs='+', default=[50])
+    parser.add_argument('--documents', type=int, nargs='+', default=[2])
+    parser.add_argument('--figures', type=int, nargs='+', default=[10])
+    parser.add_argument(
+        '--conflict-density', type=float, nargs='+', default=[0.0, 0.1]
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument(
+        '--output', help='file to write the results to as JSON (default: stdout)'
+    )
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    print_report(report, baseline)
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
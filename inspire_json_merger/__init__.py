@@ -21,3 +21,5 @@
 # or submit itself to any jurisdiction.
 
 from __future__ import absolute_import, division, print_function
+
+__version__ = '11.0.45'
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Merge records read as JSON lines on stdin and write the results to stdout.
+
+Every input line must be an object with the ``head`` and ``update`` keys and
+optionally ``root``. Every output line is an object with the ``merged`` and
+``conflicts`` keys or, if the line is invalid or the merge failed, with the
+``error`` key.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import collections
+import json
+import sys
+
+from inspire_json_merger.api import merge_iter
+
+
+def read_triples(lines):
+    """Parse JSON lines into ``(root, head, update)`` tuples, skipping blanks.
+
+    A line which is not valid JSON or misses ``head`` or ``update`` is yielded
+    as a ``ValueError`` instead, so that the following lines are still read.
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            triple = record.get('root', {}), record['head'], record['update']
+        except (AttributeError, KeyError, ValueError) as e:
+            yield ValueError(
+                'invalid input line %d: %s: %s' % (number, type(e).__name__, e)
+            )
+        else:
+            yield triple
+
+
+def merge_lines(lines, **kwargs):
+    """Merge the triples read from ``lines`` with ``merge_iter``.
+
+    The keyword arguments are passed to ``merge_iter``. The invalid lines are
+    yielded as the ``ValueError`` of ``read_triples``, in input order among
+    the results of the merges.
+    """
+    pending = collections.deque()
+    results = merge_iter(_queue_triples(read_triples(lines), pending), **kwargs)
+    for result in results:
+        while isinstance(pending[0], Exception):
+            yield pending.popleft()
+        pending.popleft()
+        yield result
+    while pending:
+        yield pending.popleft()
+
+
+def _queue_triples(items, pending):
+    for item in items:
+        pending.append(item)
+        if not isinstance(item, Exception):
+            yield item
+
+
+def format_result(result):
+    """Serialize an entry yielded by ``merge_iter`` as a JSON line."""
+    if isinstance(result, Exception):
+        output = {'error': '%s: %s' % (type(result).__name__, result)}
+    else:
+        merged, conflicts = result
+        output = {'merged': merged, 'conflicts': conflicts}
+    return json.dumps(output, sort_keys=True) + '\n'
+
+
+def main(argv=None, stdin=None, stdout=None):
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    parser = argparse.ArgumentParser(
+        prog='python -m inspire_json_merger', description=__doc__.splitlines()[0]
+    )
+    parser.add_argument(
+        '-w',
+        '--workers',
+        type=int,
+        default=1,
+        help='number of worker processes, 0 for one per CPU (default: 1)',
+    )
+    parser.add_argument(
+        '-c',
+        '--chunksize',
+        type=int,
+        default=1,
+        help='number of records sent to a worker at once (default: 1)',
+    )
+    parser.add_argument(
+        '--window',
+        type=int,
+        default=None,
+        help='maximum number of chunks in flight (default: twice the workers)',
+    )
+    parser.add_argument(
+        '--head-source',
+        default=None,
+        help='source of all the head records (default: derived per record)',
+    )
+    args = parser.parse_args(argv)
+
+    failed = False
+    results = merge_lines(
+        stdin,
+        workers=args.workers or None,
+        chunksize=args.chunksize,
+        window=args.window,
+        head_source=args.head_source,
+    )
+    for result in results:
+        failed = failed or isinstance(result, Exception)
+        stdout.write(format_result(result))
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
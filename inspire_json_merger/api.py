@@ -22,10 +22,20 @@
 
 from __future__ import absolute_import, division, print_function
 
+import bisect
+import collections
+import copy
+import itertools
+import multiprocessing
+import re
+
 from inspire_utils.helpers import force_list
 from inspire_utils.record import get_value
+from json_merger.conflict import Conflict
 from json_merger.merger import MergeError, Merger
+from six.moves import zip
 
+from inspire_json_merger.cache import get_merge_key
 from inspire_json_merger.config import (
     ArxivOnArxivOperations,
     ArxivOnPublisherOperations,
@@ -34,11 +44,28 @@ from inspire_json_merger.config import (
     PublisherOnArxivOperations,
     PublisherOnPublisherOperations,
 )
+from inspire_json_merger.instrumentation import null_stage
 from inspire_json_merger.postprocess import postprocess_results
-from inspire_json_merger.utils import filter_conflicts, filter_records
+from inspire_json_merger.utils import (
+    filter_conflicts,
+    filter_records,
+    get_fields_hashes,
+    get_fields_kept_from_head,
+)
 
 
-def merge(root, head, update, head_source=None, configuration=None):
+def merge(
+    root,
+    head,
+    update,
+    head_source=None,
+    configuration=None,
+    instrumentation=None,
+    skip_unchanged=False,
+    incremental=False,
+    pool=None,
+    cache=None,
+):
     """
     This function instantiate a ``Merger`` object using a configuration in
     according to the ``source`` value of head and update params.
@@ -52,17 +79,112 @@ def merge(root, head, update, head_source=None, configuration=None):
             heuristics are used to derive it from the metadata. This is useful
             if the HEAD came from legacy and the acquisition_source does not
             reflect the state of the record.
+        configuration(MergerConfigurationOperations): the configuration to
+            use, or the ``ConfigurationPlan`` it compiles to. If ``None``, it
+            is derived from head and update.
+        instrumentation(MergeInstrumentation): if set, it records the time
+            spent in every stage of the merge.
+        skip_unchanged(bool): if ``True``, the top-level fields which are
+            identical in root and update are not merged and keep the value they
+            have in head, without conflicts. If the whole update is identical
+            to root, a copy of head is returned.
+        incremental(bool): if ``True``, the top-level fields whose merged
+            value is known to be the one in head are copied from it instead of
+            being merged. The result is the same as without this option.
+        pool(multiprocessing.pool.Pool): if set, the top-level fields are
+            merged concurrently in this pool, which can also be a
+            ``ThreadPool``. The result is the same as without it.
+        cache(MergeCache): if set, the result is looked up in this cache,
+            e.g. a ``MemoryMergeCache`` or a ``SQLiteMergeCache``, by the
+            configuration and the content of the records, and stored there
+            after merging if it was missing.
 
     Return
         A tuple containing the resulted merged record in json format and a
         an object containing all generated conflicts.
     """
-    if not configuration:
-        configuration = get_configuration(head, update, head_source)
-    conflicts = []
-    root, head, update = filter_records(
-        root, head, update, filters=configuration.pre_filters
+    stage = instrumentation.stage if instrumentation else null_stage
+    if cache is not None:
+        if not configuration:
+            with stage('get_configuration'):
+                configuration = get_configuration(head, update, head_source)
+        with stage('cache'):
+            key = get_merge_key(root, head, update, configuration, skip_unchanged)
+            result = cache.get(key)
+        if result is None:
+            result = merge(
+                root,
+                head,
+                update,
+                configuration=configuration,
+                instrumentation=instrumentation,
+                skip_unchanged=skip_unchanged,
+                incremental=incremental,
+                pool=pool,
+            )
+            cache.set(key, result)
+        return result
+
+    unchanged_fields = set()
+    if skip_unchanged:
+        with stage('skip_unchanged'):
+            root_hashes = get_fields_hashes(root)
+            update_hashes = get_fields_hashes(update)
+        if root_hashes == update_hashes:
+            return copy.deepcopy(head), []
+        unchanged_fields = {
+            key for key, value in root_hashes.items() if update_hashes.get(key) == value
+        }
+
+    original_head = head
+    with stage('get_configuration'):
+        if not configuration:
+            configuration = get_configuration(head, update, head_source)
+        configuration = configuration.compile()
+    pre_filters = configuration.pre_filters
+    if instrumentation:
+        pre_filters = [instrumentation.wrap_filter(f) for f in pre_filters]
+    with stage('pre_filters'):
+        root, head, update = filter_records(root, head, update, filters=pre_filters)
+    head_fields = set()
+    if incremental:
+        with stage('incremental'):
+            head_fields = get_fields_kept_from_head(root, head, update)
+            head_fields -= unchanged_fields
+    filtered_head = head
+    skipped_fields = unchanged_fields | head_fields
+    if skipped_fields:
+        root, head, update = (
+            _without_fields(record, skipped_fields) for record in (root, head, update)
+        )
+    with stage('merge'):
+        if pool is None:
+            merged, conflicts = _run_merger(root, head, update, configuration)
+        else:
+            merged, conflicts = _run_merger_in_pool(
+                pool, root, head, update, configuration
+            )
+        conflicts = sorted(conflicts, key=_get_conflict_field)
+    with stage('filter_conflicts'):
+        conflicts = filter_conflicts(
+            conflicts, configuration.get_conflict_filters_trie()
+        )
+    merged.update(
+        (key, copy.deepcopy(original_head[key]))
+        for key in unchanged_fields
+        if key in original_head
+    )
+    merged.update(
+        (key, copy.deepcopy(filtered_head[key]))
+        for key in head_fields
+        if key in filtered_head
     )
+
+    with stage('postprocess'):
+        return postprocess_results(merged, conflicts)
+
+
+def _run_merger(root, head, update, configuration):
     merger = Merger(
         root=root,
         head=head,
@@ -73,15 +195,181 @@ def merge(root, head, update, head_source=None, configuration=None):
         list_merge_ops=configuration.list_merge_ops,
         comparators=configuration.comparators,
     )
-
     try:
         merger.merge()
     except MergeError as e:
-        conflicts = e.content
-    conflicts = filter_conflicts(conflicts, configuration.conflict_filters)
-    merged = merger.merged_root
+        return merger.merged_root, e.content
+
+    return merger.merged_root, []
+
+
+def _run_merger_in_pool(pool, root, head, update, configuration):
+    tasks = [
+        (
+            _only_fields(root, fields),
+            _only_fields(head, fields),
+            _only_fields(update, fields),
+            configuration,
+        )
+        for fields in _split_fields(root, head, update)
+    ]
+    merged = {}
+    conflicts = []
+    for merged_fields, fields_conflicts in pool.map(_merge_fields, tasks):
+        merged.update(merged_fields)
+        conflicts.extend(Conflict(*conflict) for conflict in fields_conflicts)
+
+    return merged, conflicts
+
+
+def _get_conflict_field(conflict):
+    # The merger orders the conflicts of different fields as it iterates over
+    # a set, so they are sorted by field, keeping their order within a field.
+    return conflict[1][:1]
+
+
+def _split_fields(root, head, update):
+    """Split the top-level fields in groups which can be merged independently.
+
+    Every list of entities gets a group of its own, as unifying them is what
+    takes time, while all the other fields are merged together.
+    """
+    list_fields = []
+    other_fields = []
+    for key in sorted(set(root) | set(head) | set(update)):
+        if isinstance(head.get(key), list) or isinstance(update.get(key), list):
+            list_fields.append([key])
+        else:
+            other_fields.append(key)
+
+    return list_fields + [other_fields] if other_fields else list_fields
+
+
+def _merge_fields(task):
+    merged, conflicts = _run_merger(*task)
+    # Conflicts can not be pickled, so they are sent back as plain tuples.
+    return merged, [tuple(conflict) for conflict in conflicts]
+
+
+def _only_fields(record, fields):
+    return {key: record[key] for key in fields if key in record}
+
+
+def _without_fields(record, fields):
+    return {key: value for key, value in record.items() if key not in fields}
+
+
+_WORKER_OPTIONS = {}
+
+
+def merge_many(
+    triples, workers=None, chunksize=1, head_source=None, configuration=None
+):
+    """
+    This function runs ``merge`` on many records, fanning the work out over a
+    pool of worker processes.
+
+    Params
+        triples(iterable): ``(root, head, update)`` tuples to merge.
+        workers(int): the number of worker processes. If ``None``, one per
+            CPU is used. If ``1``, the merges are run in the current process.
+        chunksize(int): how many triples are sent to a worker at once.
+        head_source(string): the source of all the head records, see
+            ``merge``.
+        configuration(MergerConfigurationOperations): the configuration to
+            use for all the triples. It is sent once to every worker. If
+            ``None``, it is derived per triple as in ``merge``.
+
+    Return
+        A list with one entry per triple, in input order: either the
+        ``(merged, conflicts)`` tuple returned by ``merge`` or, if merging
+        that triple failed, the exception which was raised.
+    """
+    return list(
+        merge_iter(
+            triples,
+            workers=workers,
+            chunksize=chunksize,
+            head_source=head_source,
+            configuration=configuration,
+        )
+    )
+
+
+def merge_iter(
+    triples,
+    workers=None,
+    chunksize=1,
+    window=None,
+    head_source=None,
+    configuration=None,
+):
+    """
+    This function is the lazy version of ``merge_many``: the triples are
+    consumed only as results are yielded, so that at most ``window`` chunks
+    are in flight at any time and memory stays bounded for inputs of any
+    size.
+
+    Params
+        triples(iterable): ``(root, head, update)`` tuples to merge.
+        workers(int): see ``merge_many``.
+        chunksize(int): see ``merge_many``.
+        window(int): the maximum number of chunks sent to the workers and not
+            yet yielded. If ``None``, twice the number of workers.
+        head_source(string): see ``merge_many``.
+        configuration(MergerConfigurationOperations): see ``merge_many``.
+
+    Return
+        A generator yielding one entry per triple, in input order, as
+        described in ``merge_many``.
+    """
+    options = {'head_source': head_source, 'configuration': configuration}
+    if workers == 1:
+        for triple in triples:
+            yield _merge_triple(triple, options)
+        return
+
+    workers = workers or multiprocessing.cpu_count()
+    window = window or 2 * workers
+    pending = collections.deque()
+    pool = multiprocessing.Pool(
+        processes=workers, initializer=_init_merge_worker, initargs=(options,)
+    )
+    try:
+        for chunk in _chunked(triples, chunksize):
+            if len(pending) >= window:
+                for result in pending.popleft().get():
+                    yield result
+            pending.append(pool.apply_async(_merge_chunk, (chunk,)))
+        while pending:
+            for result in pending.popleft().get():
+                yield result
+    finally:
+        pool.terminate()
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    chunk = list(itertools.islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(iterator, size))
+
+
+def _init_merge_worker(options):
+    _WORKER_OPTIONS.update(options)
 
-    return postprocess_results(merged, conflicts)
+
+def _merge_chunk(chunk):
+    return [_merge_triple(triple, _WORKER_OPTIONS) for triple in chunk]
+
+
+def _merge_triple(triple, options):
+    root, head, update = triple
+    try:
+        return merge(root, head, update, **options)
+    except Exception as e:
+        return e
 
 
 def get_configuration(head, update, head_source=None):
@@ -98,6 +386,34 @@ def get_configuration(head, update, head_source=None):
         MergerConfigurationOperations: an object containing
         the rules needed to merge HEAD and UPDATE
     """
+    return _get_configuration(head, update, head_source, is_erratum)
+
+
+def get_configurations(pairs, head_source=None):
+    """
+    This function is the batch version of ``get_configuration``: the titles of
+    all the updates are matched against the erratum keywords in a single pass
+    of one compiled regular expression.
+
+    Params:
+        pairs(iterable): ``(head, update)`` tuples.
+        head_source(string): the source of all the HEAD records
+
+    Returns:
+        list: the ``MergerConfigurationOperations`` for every pair, in input
+        order.
+    """
+    pairs = list(pairs)
+    errata = _get_errata([update for _, update in pairs])
+    return [
+        _get_configuration(
+            head, update, head_source, lambda update, erratum=erratum: erratum
+        )
+        for (head, update), erratum in zip(pairs, errata)
+    ]
+
+
+def _get_configuration(head, update, head_source, is_erratum):
     head_source = head_source or get_head_source(head)
     update_source = get_acquisition_source(update)
 
@@ -128,7 +444,7 @@ def get_head_source(json_obj):
     def no_arxiv_in_dois(obj):
         return 'dois' in obj and any(
             source.lower() != 'arxiv'
-            for source in force_list(get_value(obj, 'dois.source'))
+            for source in force_list(_get_values(obj, 'dois', 'source'))
         )
 
     if no_freetext_in_publication_info(json_obj) or no_arxiv_in_dois(json_obj):
@@ -154,27 +470,113 @@ def is_manual_merge(head, update):
     )
 
 
+ERRATUM_KEYWORDS = (
+    "erratum",
+    "corrigendum",
+    "publisher's note",
+    "publisher correction",
+    "author correction",
+)
+ERRATUM_TITLE_PREFIX = 'correction to:'
+_ERRATUM_TITLE_RE = re.compile(
+    '|'.join(re.escape(word) for word in ERRATUM_KEYWORDS + (ERRATUM_TITLE_PREFIX,))
+)
+
+ERRATUM_RULES = []
+
+
+def erratum_rule(rule):
+    """Register a rule used by ``is_erratum``.
+
+    A rule is a function taking the update record and returning whether it is
+    an erratum. The rules are evaluated in registration order, stopping at the
+    first one which matches.
+
+    Example:
+        @erratum_rule
+        def has_erratum_document_type(update):
+            return 'erratum' in update.get('document_type', [])
+    """
+    ERRATUM_RULES.append(rule)
+    return rule
+
+
 def is_erratum(update):
-    erratum_keywords = {
-        "erratum",
-        "corrigendum",
-        "publisher's note",
-        "publisher correction",
-        "author correction"
-    }
-    journal_titles_list = get_value(update, "titles.title", [])
-    journal_titles_string = " ".join(journal_titles_list).lower()
-    title_contains_erratum_keyword = any(
-        [keyword in journal_titles_string for keyword in erratum_keywords]
-    )
-    title_starts_with_correction_to = any(
-        journal_title.lower().startswith('correction to:')
-        for journal_title in journal_titles_list
+    return any(rule(update) for rule in ERRATUM_RULES)
+
+
+@erratum_rule
+def has_erratum_title(update):
+    """A title contains an erratum keyword or starts with ``correction to:``."""
+    titles = _get_lowercase_titles(update)
+    return any(
+        _is_erratum_title_match(match, titles)
+        for match in _ERRATUM_TITLE_RE.finditer(" ".join(titles))
     )
-    erratum_in_dois_material = 'erratum' in get_value(update, "dois.material", [])
-    if (
-        title_contains_erratum_keyword
-        or title_starts_with_correction_to
-        or erratum_in_dois_material
-    ):
+
+
+@erratum_rule
+def has_erratum_doi_material(update):
+    """A DOI is marked as the one of an erratum."""
+    return 'erratum' in _get_values(update, 'dois', 'material')
+
+
+def _get_lowercase_titles(update):
+    return [title.lower() for title in _get_values(update, 'titles', 'title')]
+
+
+def _get_title_starts(titles, offset=0):
+    for title in titles:
+        yield offset
+        offset += len(title) + 1
+
+
+def _is_erratum_title_match(match, titles, offset=0):
+    """Tell if a match of ``_ERRATUM_TITLE_RE`` makes ``titles`` an erratum's.
+
+    ``match`` is in a string where ``titles`` are joined by a separator from
+    ``offset``. Keywords count anywhere, while ``ERRATUM_TITLE_PREFIX`` must
+    start one of the titles and end in it.
+    """
+    if match.group() != ERRATUM_TITLE_PREFIX:
         return True
+    start = match.start() - offset
+    for title_start, title in zip(_get_title_starts(titles), titles):
+        if title_start == start:
+            return match.end() - offset <= title_start + len(title)
+    return False
+
+
+def _get_errata(updates):
+    """Tell which of the updates are errata, as ``is_erratum`` does.
+
+    The lowercased titles of all the updates are concatenated in one string,
+    which is scanned once for ``has_erratum_title``. Every match is then
+    mapped back to its update. The other rules are evaluated per update.
+    """
+    errata = [False] * len(updates)
+    if has_erratum_title in ERRATUM_RULES:
+        titles = [_get_lowercase_titles(update) for update in updates]
+        texts = [" ".join(record_titles) for record_titles in titles]
+        record_starts = list(_get_title_starts(texts))
+        for match in _ERRATUM_TITLE_RE.finditer("\0".join(texts)):
+            idx = bisect.bisect_right(record_starts, match.start()) - 1
+            if not errata[idx]:
+                errata[idx] = _is_erratum_title_match(
+                    match, titles[idx], record_starts[idx]
+                )
+
+    other_rules = [rule for rule in ERRATUM_RULES if rule is not has_erratum_title]
+    return [
+        erratum or any(rule(update) for rule in other_rules)
+        for erratum, update in zip(errata, updates)
+    ]
+
+
+def _get_values(record, field, key):
+    """Faster ``get_value(record, 'field.key', [])`` for lists of objects."""
+    values = record.get(field, [])
+    if isinstance(values, list) and all(isinstance(value, dict) for value in values):
+        return [value[key] for value in values if key in value]
+
+    return get_value(record, '.'.join((field, key)), [])
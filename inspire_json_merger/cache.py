@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Caches of merge results."""
+
+from __future__ import absolute_import, division, print_function
+
+import functools
+import json
+import sqlite3
+import threading
+import time
+import types
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+import six
+
+from inspire_json_merger import __version__
+from inspire_json_merger.utils import LRUCache, canonical_hash
+
+
+def get_merge_key(root, head, update, configuration, skip_unchanged=False):
+    """Get the key identifying the result of a merge in a ``MergeCache``.
+
+    It is made of the version of this package, the name of the configuration
+    class and the ``get_rules_digest`` of its rules, so that the entries
+    computed with other rules are not returned, and of the
+    ``canonical_hash`` of the three records, so it does not change when the
+    records are copied or their keys reordered.
+
+    Args:
+        configuration(MergerConfigurationOperations): the configuration used
+            by the merge, or the ``ConfigurationPlan`` it compiles to.
+        skip_unchanged(bool): the option of the same name of ``merge``, which
+            changes its result.
+
+    The ``incremental`` and ``pool`` options of ``merge`` are not part of the
+    key, as the merged record and the conflicts, including their order, are
+    the same with or without them.
+    """
+    plan = configuration.compile()
+    return '%s:%s.%s:%s:%d:%s:%s:%s' % (
+        __version__,
+        plan.configuration.__module__,
+        plan.configuration.__name__,
+        get_rules_digest(plan),
+        skip_unchanged,
+        canonical_hash(root),
+        canonical_hash(head),
+        canonical_hash(update),
+    )
+
+
+def get_rules_digest(configuration):
+    """Hash the rules of a configuration the same way in every process.
+
+    Operations and conflict filters are hashed by value, and comparators and
+    pre-filters by qualified name, together with the primary key fields of
+    the comparators made by ``get_pk_comparator``.
+
+    Args:
+        configuration(MergerConfigurationOperations): the configuration, or
+            the ``ConfigurationPlan`` it compiles to.
+    """
+    plan = configuration.compile()
+    cached = _RULES_DIGESTS.get(id(plan))
+    if cached is None or cached[0] is not plan:
+        rules = {
+            field: _describe_rule(getattr(plan, field))
+            for field in plan._fields
+            if field not in ('configuration', 'conflict_filters_trie')
+        }
+        cached = plan, canonical_hash(rules)
+        _RULES_DIGESTS.set(id(plan), cached)
+    return cached[1]
+
+
+_RULES_DIGESTS = LRUCache(maxsize=64)
+
+
+def _describe_rule(rule):
+    if isinstance(rule, Mapping):
+        return {key: _describe_rule(value) for key, value in rule.items()}
+    if isinstance(rule, (list, tuple)):
+        return [_describe_rule(item) for item in rule]
+    if isinstance(rule, functools.partial):
+        return {
+            'func': _describe_rule(rule.func),
+            'args': _describe_rule(rule.args),
+            'keywords': _describe_rule(rule.keywords or {}),
+        }
+    if isinstance(rule, (type, types.FunctionType)):
+        name = '%s.%s' % (
+            rule.__module__,
+            getattr(rule, '__qualname__', rule.__name__),
+        )
+        primary_key_fields = getattr(rule, 'primary_key_fields', None)
+        if primary_key_fields is None:
+            return name
+        return [name, _describe_rule(primary_key_fields)]
+    if rule is None or isinstance(
+        rule, (bool, float) + six.integer_types + six.string_types
+    ):
+        return rule
+    return repr(rule)
+
+
+class MergeCache(object):
+    """Base class of the caches of merge results used by ``merge``.
+
+    Results are stored serialized as JSON, so the ones returned are always
+    new objects which the caller is free to modify. Entries older than
+    ``ttl`` seconds are not returned, and the subclasses evict the least
+    recently used entries when there are more than ``maxsize``.
+
+    Subclasses implement ``_load``, ``_store``, ``_delete``, ``__len__`` and
+    ``clear``.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached ``(merged, conflicts)`` for ``key``, or ``None``."""
+        entry = self._load(key)
+        if entry is not None and self._is_expired(entry[0]):
+            self._delete(key)
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        merged, conflicts = json.loads(entry[1])
+        return merged, conflicts
+
+    def set(self, key, result):
+        """Cache the ``(merged, conflicts)`` returned by ``merge``."""
+        self._store(key, time.time(), json.dumps(result))
+
+    def info(self):
+        """Return a dict with the cache statistics and size."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'maxsize': self.maxsize,
+            'size': len(self),
+        }
+
+    def _is_expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+
+class MemoryMergeCache(MergeCache):
+    """Cache of merge results kept in memory by an ``LRUCache``."""
+
+    def __init__(self, maxsize=1024, ttl=None):
+        super(MemoryMergeCache, self).__init__(maxsize=maxsize, ttl=ttl)
+        self._entries = LRUCache(maxsize=maxsize)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, key):
+        return self._entries.get(key)
+
+    def _store(self, key, created, value):
+        self._entries.set(key, (created, value))
+
+    def _delete(self, key):
+        self._entries.pop(key)
+
+
+class SQLiteMergeCache(MergeCache):
+    """Cache of merge results stored in a SQLite database.
+
+    It can be shared by several processes, e.g. the workers retrying the same
+    harvest tasks, and survives their restarts.
+
+    Args:
+        path(str): the path of the database file, created if needed.
+        maxsize(int): the maximum number of entries, or ``None`` for no limit.
+        ttl(float): the number of seconds after which entries expire, or
+            ``None`` if they never do.
+    """
+
+    def __init__(self, path, maxsize=100000, ttl=None):
+        super(SQLiteMergeCache, self).__init__(maxsize=maxsize, ttl=ttl)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS merge_results ('
+                'key TEXT PRIMARY KEY, created REAL, accessed REAL, value TEXT)'
+            )
+            self._connection.execute(
+                'CREATE INDEX IF NOT EXISTS merge_results_accessed '
+                'ON merge_results (accessed)'
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute(
+                'SELECT COUNT(*) FROM merge_results'
+            ).fetchone()[0]
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM merge_results')
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        self._connection.close()
+
+    def _load(self, key):
+        with self._lock, self._connection:
+            entry = self._connection.execute(
+                'SELECT created, value FROM merge_results WHERE key = ?', (key,)
+            ).fetchone()
+            if entry is not None:
+                self._connection.execute(
+                    'UPDATE merge_results SET accessed = ? WHERE key = ?',
+                    (time.time(), key),
+                )
+        return entry
+
+    def _store(self, key, created, value):
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO merge_results VALUES (?, ?, ?, ?)',
+                (key, created, created, value),
+            )
+            if self.maxsize is not None:
+                self._connection.execute(
+                    'DELETE FROM merge_results WHERE key IN ('
+                    'SELECT key FROM merge_results ORDER BY accessed DESC '
+                    'LIMIT -1 OFFSET ?)',
+                    (self.maxsize,),
+                )
+
+    def _delete(self, key):
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM merge_results WHERE key = ?', (key,))
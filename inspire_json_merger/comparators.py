@@ -30,12 +30,28 @@ from json_merger.contrib.inspirehep.author_util import (
     NameToken,
 )
 from json_merger.contrib.inspirehep.comparators import DistanceFunctionComparator
+from json_merger.contrib.inspirehep.match import BipartiteConnectedComponents
+from json_merger.utils import get_obj_at_key_path
+from munkres import Munkres
+from pyrsistent import freeze, pmap
+from six.moves import zip
 
-from inspire_json_merger.utils import scan_author_string_for_phrases
+from inspire_json_merger.utils import LRUCache, scan_author_string_for_phrases
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+AUTHOR_TOKENIZE_CACHE_SIZE = 16384
+AUTHOR_NORMALIZE_CACHE_SIZE = 16384
 
 
 def author_tokenize(name):
-    """This is how the name should be tokenized for the matcher."""
+    """This is how the name should be tokenized for the matcher.
+
+    The result is immutable so that it can be shared through a cache.
+    """
     phrases = scan_author_string_for_phrases(name)
     res = {'lastnames': [], 'nonlastnames': []}
     for key, tokens in phrases.items():
@@ -47,7 +63,52 @@ def author_tokenize(name):
                 lst.append(NameInitial(token))
             else:
                 lst.append(NameToken(token))
-    return res
+    return pmap({key: tuple(tokens) for key, tokens in res.items()})
+
+
+class CachedTokenizer(object):
+    """Callable memoizing a tokenize function by the raw name string."""
+
+    _missing = object()
+
+    def __init__(self, tokenize_function, maxsize=AUTHOR_TOKENIZE_CACHE_SIZE):
+        self.tokenize_function = tokenize_function
+        self.cache = LRUCache(maxsize)
+
+    def __call__(self, name):
+        tokens = self.cache.get(name, self._missing)
+        if tokens is self._missing:
+            tokens = self.tokenize_function(name)
+            self.cache.set(name, tokens)
+        return tokens
+
+
+cached_author_tokenize = CachedTokenizer(author_tokenize)
+
+
+class CachedAuthorNormalizer(object):
+    """Callable memoizing an ``AuthorNameNormalizer`` by the full name.
+
+    Name normalizers only read the ``full_name`` of the author, so the
+    normalized names of the authors of a head record are computed once when
+    it is merged with several updates in a row, e.g. every new arXiv version
+    and then the publisher's, and only the new names of the updates are
+    normalized.
+    """
+
+    _missing = object()
+
+    def __init__(self, normalizer, maxsize=AUTHOR_NORMALIZE_CACHE_SIZE):
+        self.normalizer = normalizer
+        self.cache = LRUCache(maxsize)
+
+    def __call__(self, author):
+        name = author.get('full_name', '')
+        normalized = self.cache.get(name, self._missing)
+        if normalized is self._missing:
+            normalized = self.normalizer(author)
+            self.cache.set(name, normalized)
+        return normalized
 
 
 class IDNormalizer(object):
@@ -64,31 +125,368 @@ class IDNormalizer(object):
         return None
 
 
-class AuthorComparator(DistanceFunctionComparator):
+def munkres_assignment(dist_matrix):
+    """Return the ``(row, column)`` pairs of a minimum cost assignment.
+
+    This uses the pure Python ``munkres`` package, which is slow on big
+    matrices but always available.
+    """
+    return Munkres().compute(dist_matrix)
+
+
+def scipy_assignment(dist_matrix):
+    """Same as ``munkres_assignment``, using SciPy's ``linear_sum_assignment``.
+
+    It is much faster on big matrices, but among several assignments with the
+    same minimum cost it can return a different one than
+    ``munkres_assignment``, which it falls back to if the ``scipy`` extra is
+    not installed.
+    """
+    if linear_sum_assignment is None:
+        return munkres_assignment(dist_matrix)
+    rows, columns = linear_sum_assignment(dist_matrix)
+    return list(zip(rows.tolist(), columns.tolist()))
+
+
+class IndexedMatchesMixin(object):
+    """Comparator mixin looking up the matches of an entry in a map.
+
+    ``BaseComparator.get_matches`` checks every entry of the other list, so
+    calling it for every entry, as the merger does, is quadratic.
+    """
+
+    def get_matches(self, src, src_idx):
+        if src not in ('l1', 'l2'):
+            raise ValueError('Must have one of "l1" or "l2" as src')
+        if '_matches_by_source' not in self.__dict__:
+            self._matches_by_source = _get_matches_by_source(self.matches)
+
+        target_list = self.l2 if src == 'l1' else self.l1
+        return [
+            (trg_idx, target_list[trg_idx])
+            for trg_idx in self._matches_by_source[src].get(src_idx, ())
+        ]
+
+
+def _get_matches_by_source(matches):
+    matches_by_source = {'l1': {}, 'l2': {}}
+    for l1_idx, l2_idx in sorted(matches):
+        matches_by_source['l1'].setdefault(l1_idx, []).append(l2_idx)
+        matches_by_source['l2'].setdefault(l2_idx, []).append(l1_idx)
+    for matches_by_idx in matches_by_source.values():
+        for indexes in matches_by_idx.values():
+            indexes.sort()
+    return matches_by_source
+
+
+class AuthorComparator(IndexedMatchesMixin, DistanceFunctionComparator):
+    """Match authors by IDs and normalized names, then by name distance.
+
+    The authors left unmatched by the normalization functions are split in
+    the connected components of the graph whose edges are the pairs within
+    ``threshold``, and an assignment is solved in each of them with
+    ``assignment_function``. This is ``munkres_assignment``, so that the
+    matches do not depend on the installed packages, and subclasses can set
+    it to ``scipy_assignment`` to match big author lists faster.
+    """
+
     threshold = 0.12
-    distance_function = AuthorNameDistanceCalculator(author_tokenize)
+    assignment_function = staticmethod(munkres_assignment)
+    distance_function = AuthorNameDistanceCalculator(cached_author_tokenize)
     norm_functions = [
         IDNormalizer('ORCID'),
         IDNormalizer('INSPIRE ID'),
         IDNormalizer('INSPIRE BAI'),
-        AuthorNameNormalizer(author_tokenize),
-        AuthorNameNormalizer(author_tokenize, asciify=True),
-        AuthorNameNormalizer(author_tokenize, first_names_number=1),
-        AuthorNameNormalizer(author_tokenize, first_names_number=1, asciify=True),
-        AuthorNameNormalizer(
-            author_tokenize, first_names_number=1, first_name_to_initial=True
+        CachedAuthorNormalizer(AuthorNameNormalizer(cached_author_tokenize)),
+        CachedAuthorNormalizer(
+            AuthorNameNormalizer(cached_author_tokenize, asciify=True)
+        ),
+        CachedAuthorNormalizer(
+            AuthorNameNormalizer(cached_author_tokenize, first_names_number=1)
+        ),
+        CachedAuthorNormalizer(
+            AuthorNameNormalizer(
+                cached_author_tokenize, first_names_number=1, asciify=True
+            )
         ),
-        AuthorNameNormalizer(
-            author_tokenize,
-            first_names_number=1,
-            first_name_to_initial=True,
-            asciify=True,
+        CachedAuthorNormalizer(
+            AuthorNameNormalizer(
+                cached_author_tokenize,
+                first_names_number=1,
+                first_name_to_initial=True,
+            )
+        ),
+        CachedAuthorNormalizer(
+            AuthorNameNormalizer(
+                cached_author_tokenize,
+                first_names_number=1,
+                first_name_to_initial=True,
+                asciify=True,
+            )
         ),
     ]
+    block_function = None
+
+    def process_lists(self):
+        self.matches = set(
+            blocked_distance_function_match(
+                self.l1,
+                self.l2,
+                self.threshold,
+                self.distance_function,
+                self.norm_functions,
+                self.block_function,
+                self.assignment_function,
+            )
+        )
+
+
+_ASCIIFIED_NAME_NORMALIZER = AuthorComparator.norm_functions[4]
+
+
+def author_blocking_keys(author):
+    """Return the blocks an author belongs to for ``BlockingAuthorComparator``.
+
+    For every token of the asciified name that is not an initial, there is one
+    block for its first two characters and one for its last two, so that names
+    with a typo in a token or written in a different order still share a block.
+    IDs are not used because the distance is computed only on names, and
+    matching by ID is already done by the normalization functions.
+    """
+    keys = set()
+    for token in _ASCIIFIED_NAME_NORMALIZER(author):
+        if len(token) > 1:
+            keys.add(('prefix', token[:2]))
+            keys.add(('suffix', token[-2:]))
+    return keys
+
+
+def blocked_distance_function_match(
+    l1,
+    l2,
+    thresh,
+    dist_fn,
+    norm_funcs,
+    block_fn=None,
+    assignment_fn=munkres_assignment,
+):
+    """Return pairs of matching indices from l1 and l2.
+
+    This is ``json_merger.contrib.inspirehep.match.distance_function_match``
+    where, after the normalization functions, distances are only computed
+    between elements sharing at least a key returned by ``block_fn`` instead
+    of between all the remaining elements. The result is the same as long as
+    every pair within ``thresh`` shares a block. If ``block_fn`` is ``None``,
+    all the remaining elements are compared.
+
+    The assignment in each connected component is solved by ``assignment_fn``,
+    which gets the distance matrix of the component and returns the
+    ``(row, column)`` pairs of a minimum cost assignment.
+    """
+    common = []
+    l1 = list(enumerate(l1))
+    l2 = list(enumerate(l2))
+
+    for norm_fn in norm_funcs:
+        new_common, l1, l2 = _match_by_norm_func(
+            l1,
+            l2,
+            lambda a, norm_fn=norm_fn: norm_fn(a[1]),
+            lambda a1, a2: dist_fn(a1[1], a2[1]),
+            thresh,
+        )
+        common.extend((c1[0], c2[0]) for c1, c2 in new_common)
+
+    blocks = {}
+    if block_fn is not None:
+        for l2_i, (_, e2) in enumerate(l2):
+            for key in block_fn(e2):
+                blocks.setdefault(key, set()).add(l2_i)
+
+    distances = {}
+
+    def distance(l1_i, l2_i):
+        if (l1_i, l2_i) not in distances:
+            distances[l1_i, l2_i] = dist_fn(l1[l1_i][1], l2[l2_i][1])
+        return distances[l1_i, l2_i]
+
+    # Edges are added in the same order as in ``distance_function_match`` so
+    # that the connected components, and thus the Munkres input, are the same.
+    components = BipartiteConnectedComponents()
+    for l1_i, (_, e1) in enumerate(l1):
+        if block_fn is None:
+            candidates = range(len(l2))
+        else:
+            candidates = set()
+            for key in block_fn(e1):
+                candidates.update(blocks.get(key, ()))
+            candidates = sorted(candidates)
+        for l2_i in candidates:
+            if distance(l1_i, l2_i) <= thresh:
+                components.add_edge(l1_i, l2_i)
+
+    for l1_indices, l2_indices in components.get_connected_components():
+        part_l1 = [l1[i] for i in l1_indices]
+        part_l2 = [l2[i] for i in l2_indices]
+
+        part_dist_matrix = [
+            [distance(l1_i, l2_i) for l2_i in l2_indices] for l1_i in l1_indices
+        ]
+        part_cmn = _match_assignment(
+            part_l1, part_l2, part_dist_matrix, thresh, assignment_fn
+        )
+
+        common.extend((c1[0], c2[0]) for c1, c2 in part_cmn)
+
+    return common
+
+
+def _match_by_norm_func(l1, l2, norm_fn, dist_fn, thresh):
+    """Match the elements of l1 and l2 with the same normalized value.
+
+    This is ``json_merger.contrib.inspirehep.match._match_by_norm_func``,
+    which is private to json-merger. The lists contain ``(index, element)``
+    pairs, which are matched when their normalized value is shared by as many
+    pairs in both lists, with equal elements in one of them, and their
+    distance is within ``thresh``. Returns the matched pairs and the
+    unmatched ones of each list.
+    """
+    common = []
+    l1_only_idx = set(range(len(l1)))
+    l2_only_idx = set(range(len(l2)))
+
+    buckets_l1 = {}
+    for e1_idx, e1 in enumerate(l1):
+        buckets_l1.setdefault(norm_fn(e1), []).append((e1_idx, e1))
+    buckets_l2 = {}
+    for e2_idx, e2 in enumerate(l2):
+        buckets_l2.setdefault(norm_fn(e2), []).append((e2_idx, e2))
+
+    for normed, l1_elements in buckets_l1.items():
+        l2_elements = buckets_l2.get(normed, [])
+        if not l2_elements:
+            continue
+        _, (_, e1_first) = l1_elements[0]
+        _, (_, e2_first) = l2_elements[0]
+        match_is_ambiguous = not (
+            len(l1_elements) == len(l2_elements)
+            and (
+                all(e2 == e2_first for _, (_, e2) in l2_elements)
+                or all(e1 == e1_first for _, (_, e1) in l1_elements)
+            )
+        )
+        if match_is_ambiguous:
+            continue
+        for (e1_idx, e1), (e2_idx, e2) in zip(l1_elements, l2_elements):
+            if dist_fn(e1, e2) > thresh:
+                continue
+            l1_only_idx.remove(e1_idx)
+            l2_only_idx.remove(e2_idx)
+            common.append((e1, e2))
+
+    l1_only = [l1[idx] for idx in sorted(l1_only_idx)]
+    l2_only = [l2[idx] for idx in sorted(l2_only_idx)]
+
+    return common, l1_only, l2_only
+
+
+def _match_assignment(l1, l2, dist_matrix, thresh, assignment_fn):
+    """Same as ``json_merger.contrib.inspirehep.match._match_munkres``, with
+    the assignment solved by ``assignment_fn``."""
+    equal_dist_matches = set()
+    for l1_idx, l2_idx in assignment_fn(dist_matrix):
+        dst = dist_matrix[l1_idx][l2_idx]
+        if dst > thresh:
+            continue
+        for eq_l2_idx, eq_val in enumerate(dist_matrix[l1_idx]):
+            if abs(dst - eq_val) < 1e-9:
+                equal_dist_matches.add((l1_idx, eq_l2_idx))
+        for eq_l1_idx, eq_row in enumerate(dist_matrix):
+            if abs(dst - eq_row[l2_idx]) < 1e-9:
+                equal_dist_matches.add((eq_l1_idx, l2_idx))
+
+    return [(l1[l1_idx], l2[l2_idx]) for l1_idx, l2_idx in equal_dist_matches]
+
+
+class BlockingAuthorComparator(AuthorComparator):
+    """``AuthorComparator`` which only compares authors sharing a block.
+
+    This avoids computing the distance between every pair of unmatched
+    authors, which is quadratic on big collaborations. The matches can only
+    differ from ``AuthorComparator`` for names within the threshold that
+    differ in all their non initial tokens.
+    """
+
+    block_function = staticmethod(author_blocking_keys)
+
+
+class ScipyAuthorComparator(AuthorComparator):
+    """``AuthorComparator`` solving the assignments with ``scipy_assignment``.
+
+    It can replace ``AuthorComparator`` in the ``comparators`` of a
+    configuration merging big author lists. As ties can be broken differently,
+    the matches can then depend on whether SciPy is installed.
+    """
+
+    assignment_function = staticmethod(scipy_assignment)
+
+
+class IndexedPrimaryKeyComparator(IndexedMatchesMixin, PrimaryKeyComparator):
+    """``PrimaryKeyComparator`` matching the entries through a hash map.
+
+    Instead of comparing every pair of entries, the entries of the second list
+    are indexed by their keys, which are the whole entry and, for every set of
+    ``primary_key_fields``, the normalized values of its fields, and then the
+    entries of the first list are looked up by their keys. A set of fields
+    gives no key for entries missing all of them, as these never match on it.
+    The matches are the same as the pairwise ones. If some key can't be
+    hashed, the comparator falls back to comparing every pair.
+    """
+
+    def process_lists(self):
+        try:
+            self.matches = self._get_indexed_matches()
+        except TypeError:
+            super(IndexedPrimaryKeyComparator, self).process_lists()
+
+    def _get_indexed_matches(self):
+        field_sets = [
+            field_set if isinstance(field_set, list) else [field_set]
+            for field_set in self.primary_key_fields
+        ]
+        index = {}
+        for l2_idx, obj in enumerate(self.l2):
+            for key in self._get_keys(obj, field_sets):
+                index.setdefault(key, []).append(l2_idx)
+
+        matches = set()
+        for l1_idx, obj in enumerate(self.l1):
+            for key in self._get_keys(obj, field_sets):
+                matches.update((l1_idx, l2_idx) for l2_idx in index.get(key, ()))
+        return matches
+
+    def _get_keys(self, obj, field_sets):
+        keys = {(None, freeze(obj))}
+        for number, field_set in enumerate(field_sets):
+            values = tuple(self._get_key_value(obj, field) for field in field_set)
+            if any(values):
+                keys.add((number, values))
+        return keys
+
+    def _get_key_value(self, obj, field):
+        key_path = tuple(k for k in field.split('.') if k)
+        value = get_obj_at_key_path(obj, key_path, _MISSING)
+        if value is _MISSING:
+            return ()
+        fn = self.normalization_functions.get(field, lambda x: x)
+        return (freeze(fn(value)),)
+
+
+_MISSING = object()
 
 
 def get_pk_comparator(primary_key_fields, normalization_functions=None):
-    class Ret(PrimaryKeyComparator):
+    class Ret(IndexedPrimaryKeyComparator):
         __doc__ = 'primary_key_fields:%s, normalization_functions:%s' % (
             primary_key_fields,
             normalization_functions,
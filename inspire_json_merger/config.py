@@ -22,8 +22,11 @@
 
 from __future__ import absolute_import, division, print_function
 
+from collections import namedtuple
+
 from json_merger.config import DictMergerOps as D
 from json_merger.config import UnifierOps as U
+from pyrsistent import pmap
 
 from inspire_json_merger.comparators import COMPARATORS, GROBID_ON_ARXIV_COMPARATORS
 from inspire_json_merger.pre_filters import (
@@ -38,12 +41,75 @@ from inspire_json_merger.pre_filters import (
     update_authors_with_ordering_info,
     update_material,
 )
+from inspire_json_merger.utils import compile_conflict_filters
 
 """
 This module provides different sets of rules that `inspire_json_merge`
 """
 
 
+class ConfigurationPlan(
+    namedtuple(
+        'ConfigurationPlan',
+        [
+            'configuration',
+            'default_dict_merge_op',
+            'default_list_merge_op',
+            'list_dict_ops',
+            'list_merge_ops',
+            'comparators',
+            'pre_filters',
+            'conflict_filters',
+            'conflict_filters_trie',
+        ],
+    )
+):
+    """Immutable version of a configuration, returned by its ``compile``.
+
+    It can be used everywhere a configuration is expected. The rules are
+    stored in persistent maps and tuples, ``list_merge_ops`` has an entry for
+    every list with a comparator, and the conflict filters are already
+    compiled in a trie.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_configuration(cls, configuration):
+        list_merge_ops = dict.fromkeys(
+            configuration.comparators or {}, configuration.default_list_merge_op
+        )
+        list_merge_ops.update(configuration.list_merge_ops or {})
+        return cls(
+            configuration=configuration,
+            default_dict_merge_op=configuration.default_dict_merge_op,
+            default_list_merge_op=configuration.default_list_merge_op,
+            list_dict_ops=pmap(configuration.list_dict_ops or {}),
+            list_merge_ops=pmap(list_merge_ops),
+            comparators=pmap(configuration.comparators or {}),
+            pre_filters=tuple(configuration.pre_filters),
+            conflict_filters=tuple(configuration.conflict_filters),
+            conflict_filters_trie=compile_conflict_filters(
+                configuration.conflict_filters
+            ),
+        )
+
+    def __reduce__(self):
+        # Comparators can be local classes, which can not be pickled, so the
+        # plan is compiled again from its configuration when unpickled.
+        return _compile_configuration, (self.configuration,)
+
+    def compile(self):
+        return self
+
+    def get_conflict_filters_trie(self):
+        return self.conflict_filters_trie
+
+
+def _compile_configuration(configuration):
+    return configuration.compile()
+
+
 class MergerConfigurationOperations(object):
     default_dict_merge_op = D.FALLBACK_KEEP_HEAD
     default_list_merge_op = U.KEEP_UPDATE_AND_HEAD_ENTITIES_UPDATE_FIRST
@@ -53,6 +119,46 @@ class MergerConfigurationOperations(object):
     list_dict_ops = None
     list_merge_ops = None
 
+    @classmethod
+    def get_conflict_filters_trie(cls):
+        """Return the ``conflict_filters`` compiled in a trie.
+
+        The trie is cached on the class and rebuilt only if
+        ``conflict_filters`` changes.
+        """
+        conflict_filters = tuple(cls.conflict_filters)
+        cached = cls.__dict__.get('_conflict_filters_trie')
+        if cached is None or cached[0] != conflict_filters:
+            cached = conflict_filters, compile_conflict_filters(conflict_filters)
+            cls._conflict_filters_trie = cached
+        return cached[1]
+
+    @classmethod
+    def compile(cls):
+        """Return the configuration compiled in a ``ConfigurationPlan``.
+
+        The plan is cached on the class and compiled again only if one of the
+        rules changes.
+        """
+        rules = (
+            cls.default_dict_merge_op,
+            cls.default_list_merge_op,
+            _get_items(cls.list_dict_ops),
+            _get_items(cls.list_merge_ops),
+            _get_items(cls.comparators),
+            tuple(cls.pre_filters),
+            tuple(cls.conflict_filters),
+        )
+        cached = cls.__dict__.get('_plan')
+        if cached is None or cached[0] != rules:
+            cached = rules, ConfigurationPlan.from_configuration(cls)
+            cls._plan = cached
+        return cached[1]
+
+
+def _get_items(rules):
+    return tuple(rules.items()) if rules else ()
+
 
 class ArxivOnArxivOperations(MergerConfigurationOperations):
     comparators = COMPARATORS
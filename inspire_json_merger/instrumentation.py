@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Instrumentation of the stages of a merge."""
+
+from __future__ import absolute_import, division, print_function
+
+import contextlib
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+class MergeInstrumentation(object):
+    """Record the wall time and allocations of every stage of ``merge``.
+
+    Every stage, including each pre-filter, is recorded in ``stages`` as a
+    tuple ``(name, duration, allocated)``. The allocations are the difference
+    in memory traced by ``tracemalloc``, and are ``None`` if it is not tracing.
+
+    Args:
+        callback(callable): if set, it is also called as
+            ``callback(name, duration, allocated)`` at the end of every stage,
+            e.g. to export them to a metrics system.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.stages = []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        memory_before = _traced_memory()
+        start = timer()
+        try:
+            yield
+        finally:
+            duration = timer() - start
+            memory_after = _traced_memory()
+            allocated = None
+            if memory_before is not None and memory_after is not None:
+                allocated = memory_after - memory_before
+            self.stages.append((name, duration, allocated))
+            if self.callback:
+                self.callback(name, duration, allocated)
+
+    def wrap_filter(self, filter_):
+        """Return ``filter_`` recording itself as a ``pre_filters.`` stage."""
+        name = 'pre_filters.%s' % get_filter_name(filter_)
+
+        def instrumented_filter(root, head, update):
+            with self.stage(name):
+                return filter_(root, head, update)
+
+        if hasattr(filter_, 'fields'):
+            instrumented_filter.fields = filter_.fields
+        return instrumented_filter
+
+
+def get_filter_name(filter_):
+    """Return a readable name for a pre-filter, also if it's a ``partial``."""
+    func = getattr(filter_, 'func', None)
+    if func is not None:
+        args = ', '.join(str(arg) for arg in filter_.args)
+        return '%s(%s)' % (get_filter_name(func), args)
+    return getattr(filter_, '__name__', repr(filter_))
+
+
+class _NullStage(object):
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def null_stage(name):
+    """Stage used by ``merge`` when no instrumentation is given."""
+    return _NULL_STAGE
+
+
+def _traced_memory():
+    if tracemalloc is None or not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.get_traced_memory()[0]
@@ -21,8 +21,7 @@
 # or submit itself to any jurisdiction.
 from __future__ import absolute_import, division, print_function
 
-import itertools
-import json
+from collections import Counter
 
 try:
     from collections.abc import Iterable
@@ -30,50 +29,100 @@ except ImportError:
     from collections import Iterable
 
 from json_merger.conflict import Conflict
-from pyrsistent import thaw
+from json_merger.utils import force_list
+from pyrsistent import freeze, thaw
+from six.moves import zip
 
 from inspire_json_merger.utils import ORDER_KEY
 
 
-def postprocess_results(merged, conflicts):
+def postprocess_results(merged, conflicts, lazy=False):
     """Run all postprocessing to provide output understandable by record-editor.
 
     Args:
         merged(dict): Merged document
         conflicts(list): List of all possible conflicts
+        lazy(bool): If set, the conflicts are returned as a generator.
 
     Returns: A tuple containing the resulted merged record in json format and a
         an list containing all generated conflicts.
 
     """
 
-    conflicts, merged = postprocess_conflicts(conflicts, merged)
-    conflicts_as_json = [json.loads(c.to_json()) for c in conflicts]
-    flat_conflicts_as_json = remove_ordering_from_conflicts(
-        list(itertools.chain.from_iterable(conflicts_as_json))
+    conflicts, merged = _postprocess_conflicts(conflicts, merged)
+    flat_conflicts_as_json = (
+        _remove_ordering_from_conflict(conflict)
+        for conflict in flatten_conflicts(conflicts)
     )
+    if not lazy:
+        flat_conflicts_as_json = list(flat_conflicts_as_json)
     merged = remove_ordering_from_authors_merged(merged)
 
     return merged, flat_conflicts_as_json
 
 
+JSON_PATCH_OPS = {
+    'ADD_BACK_TO_HEAD': 'add',
+    'INSERT': 'add',
+    'MANUAL_MERGE': 'add',
+    'REMOVE_FIELD': 'remove',
+    'REORDER': 'replace',
+    'SET_FIELD': 'replace',
+}
+
+
+def flatten_conflicts(conflicts):
+    """Convert conflicts to the json-patch like dicts used by record-editor.
+
+    This yields the same as ``json.loads(conflict.to_json())`` for every
+    conflict, without serializing and parsing them.
+    """
+    for conflict_type, path, body in conflicts:
+        op = JSON_PATCH_OPS.get(conflict_type)
+        if op is None:
+            raise ValueError(
+                'Conflict Type %s can not be mapped to a json-patch operation'
+                % conflict_type
+            )
+        if conflict_type in ('MANUAL_MERGE', 'ADD_BACK_TO_HEAD'):
+            path += ('-',)
+        json_pointer = '/' + '/'.join(str(el) for el in path)
+
+        for value in force_list(thaw(body)):
+            if value is not None or conflict_type == 'REMOVE_FIELD':
+                yield {
+                    'path': json_pointer,
+                    'op': op,
+                    'value': value,
+                    '$type': conflict_type,
+                }
+
+
 def remove_ordering_from_conflicts(conflicts):
     """Cleans up ordering information in conflicts."""
     for conflict in conflicts:
-        if isinstance(conflict["value"], dict):
-            conflict["value"].pop(ORDER_KEY, None)
+        _remove_ordering_from_conflict(conflict)
     return conflicts
 
 
+def _remove_ordering_from_conflict(conflict):
+    if isinstance(conflict["value"], dict):
+        conflict["value"].pop(ORDER_KEY, None)
+    return conflict
+
+
 def remove_ordering_from_authors_merged(merged):
-    """Cleans up ordering information in merged record."""
-    authors = []
-    if "authors" in merged:
-        for author in merged["authors"]:
-            author = thaw(author)
-            author.pop(ORDER_KEY, None)
-            authors.append(author)
-        merged["authors"] = authors
+    """Cleans up ordering information in merged record.
+
+    The authors carrying ordering information are the dicts built by the
+    merger and by ``postprocess_conflicts``, so the key is removed in place
+    instead of copying every author.
+    """
+    authors = merged.get("authors", [])
+    for idx, author in enumerate(authors):
+        if not isinstance(author, dict):
+            author = authors[idx] = thaw(author)
+        author.pop(ORDER_KEY, None)
     return merged
 
 
@@ -88,6 +137,9 @@ def postprocess_conflicts(conflicts, merged):
             from HEAD at the right position.
         - Look for ADD_BACK_TO_HEAD conflict with identical content as HEAD
             change and remove it as it's already added to HEAD
+    Every insertion in ``merged`` shifts the positions of the other conflicts
+    in the same field, which are computed at the end by ``ConflictPositions``.
+
     Args:
         conflicts(list): List of all possible conflicts
         merged(dict): Merged document
@@ -95,31 +147,8 @@ def postprocess_conflicts(conflicts, merged):
     Returns: A tuple containing the resulted merged record in json format and a
         an list containing all generated conflicts.
     """
-    new_conflicts = []
-    possible_duplicates = set()
-    conflicts = sorted(conflicts, key=lambda conflict: conflict[0])
-    # Sort by conflict type so we could process "ADD_BACK_TO_HEAD" after "MANUAL_MERGE"
-    while conflicts:
-        conflict = conflicts.pop()
-        conflict_type, conflict_location, conflict_content = conflict
-        if conflict_type == "MANUAL_MERGE" and conflict_location[0] == "authors":
-            new_conflict, merged, head = _process_author_manual_merge_conflict(
-                conflict, merged
-            )
-            if new_conflict:
-                new_conflicts, conflicts = add_conflict(
-                    new_conflict, new_conflicts, conflicts
-                )
-                possible_duplicates.add(head)
-        elif not _is_conflict_duplicated(conflict, possible_duplicates):
-            if conflict_type == "ADD_BACK_TO_HEAD":
-                new_conflict, merged = _process_add_back_to_head(conflict, merged)
-                new_conflicts, conflicts = add_conflict(
-                    new_conflict, new_conflicts, conflicts
-                )
-            else:
-                new_conflicts.append(conflict)
-    return new_conflicts, merged
+    records, merged = _postprocess_conflicts(conflicts, merged)
+    return [record.to_conflict() for record in records], merged
 
 
 def add_conflict(conflict, processed_conflicts, unprocessed_conflicts):
@@ -141,40 +170,210 @@ def add_conflict(conflict, processed_conflicts, unprocessed_conflicts):
 def update_conflicts_list(conflict, conflict_list):
     """Updates positions in provided conflict_list for conflict which will be added
 
+    This shifts the positions one insertion at a time, ``postprocess_conflicts``
+    uses ``ConflictPositions`` directly to shift them once for all insertions.
+
     Args:
         conflict(Conflict): New conflict
         conflict_list(list): List of conflicts where positions should be updated
     """
-    new_type, new_path, new_content = conflict
-    for idx, processed_conflict in enumerate(conflict_list):
-        path = processed_conflict[1]
-        if (
-            path[0] == new_path[0]
-            and len(path) > 1
-            and len(new_path) > 1
-            and path[1] >= new_path[1]
-        ):
-            path = list(path)
-            path[1] += 1
-            path = tuple(path)
-            conflict_list[idx] = Conflict(
-                processed_conflict[0], path, processed_conflict[2]
-            )
+    positions = ConflictPositions()
+    records = [positions.track(existing) for existing in conflict_list]
+    positions.insert(conflict)
+    conflict_list[:] = [record.to_conflict() for record in positions.resolve(records)]
     return conflict_list
 
 
-def _process_add_back_to_head(conflict, merged):
+def _postprocess_conflicts(conflicts, merged):
+    """Same as ``postprocess_conflicts``, returning ``ConflictRecord``s."""
+    positions = ConflictPositions()
+    authors = OrderKeyIndex(merged["authors"]) if "authors" in merged else None
+    new_records = []
+    possible_duplicates = set()
+    records = [
+        positions.track(conflict)
+        for conflict in sorted(conflicts, key=lambda conflict: conflict[0])
+    ]
+    # Sort by conflict type so we could process "ADD_BACK_TO_HEAD" after "MANUAL_MERGE"
+    while records:
+        record = records.pop()
+        conflict = record.conflict
+        conflict_type, conflict_location, conflict_content = conflict
+        if conflict_type == "MANUAL_MERGE" and conflict_location[0] == "authors":
+            new_conflict, merged, head = _process_author_manual_merge_conflict(
+                conflict, merged, authors
+            )
+            if new_conflict:
+                new_records.append(positions.insert(new_conflict))
+                possible_duplicates.add(head)
+        elif not _is_conflict_duplicated(conflict, possible_duplicates):
+            if conflict_type == "ADD_BACK_TO_HEAD":
+                conflict = positions.current(record)
+                new_conflict, merged = _process_add_back_to_head(
+                    conflict, merged, authors
+                )
+                new_records.append(positions.insert(new_conflict))
+            else:
+                new_records.append(record)
+    return positions.resolve(new_records), merged
+
+
+class ConflictRecord(object):
+    """Conflict being postprocessed, whose list index can be shifted in place.
+
+    For a conflict in a list field, i.e. with a path ``(field, index, ...)``,
+    ``index`` is its index after the first ``epoch`` insertions in the field.
+    Both are ``None`` for the other conflicts. Iterating over a record yields
+    the type, the path at ``index`` and the content, like a ``Conflict``.
+    """
+
+    __slots__ = ("conflict", "epoch", "index")
+
+    def __init__(self, conflict, epoch=None):
+        self.conflict = conflict
+        self.epoch = epoch
+        self.index = conflict[1][1] if epoch is not None else None
+
+    def __iter__(self):
+        conflict_type, path, content = self.conflict
+        yield conflict_type
+        yield self.get_path()
+        yield content
+
+    def __repr__(self):
+        return "ConflictRecord(%r, epoch=%r, index=%r)" % (
+            self.conflict,
+            self.epoch,
+            self.index,
+        )
+
+    @property
+    def field(self):
+        return self.conflict[1][0]
+
+    def get_path(self):
+        path = self.conflict[1]
+        if self.epoch is None or self.index == path[1]:
+            return path
+        return (path[0], self.index) + tuple(path[2:])
+
+    def to_conflict(self):
+        """Return the conflict with its path at ``index``."""
+        if self.epoch is None or self.index == self.conflict[1][1]:
+            return self.conflict
+        return _with_index(self.conflict, self.index)
+
+
+class ConflictPositions(object):
+    """Track the positions of conflicts while items are inserted in lists.
+
+    Inserting an item at position ``p`` of a top-level field shifts by one
+    every conflict of that field whose second path element is at least ``p``.
+    Instead of rewriting the conflicts at every insertion, each conflict is
+    wrapped in a ``ConflictRecord`` remembering how many insertions were made
+    in its field when its index was computed. The final indexes of all the
+    records are then computed in one pass per field, and set in place.
+    """
+
+    def __init__(self):
+        self.insertions = {}
+
+    def track(self, conflict):
+        """Return the ``ConflictRecord`` of a conflict at the current position."""
+        path = conflict[1]
+        if len(path) > 1 and isinstance(path[1], int):
+            return ConflictRecord(conflict, len(self.insertions.get(path[0], ())))
+        return ConflictRecord(conflict)
+
+    def insert(self, conflict):
+        """Record the insertion made for a new conflict and return its record."""
+        record = self.track(conflict)
+        if record.epoch is not None:
+            insertions = self.insertions.setdefault(record.field, [])
+            insertions.append(record.index)
+            record.epoch = len(insertions)
+        return record
+
+    def current(self, record):
+        """Return the conflict of a record with its path at the current position."""
+        if record.epoch is None:
+            return record.conflict
+        index = record.index
+        for position in self.insertions.get(record.field, [])[record.epoch :]:
+            if index >= position:
+                index += 1
+        return _with_index(record.conflict, index)
+
+    def resolve(self, records):
+        """Set the final index of the records in place and return them."""
+        records_by_field = {}
+        for record in records:
+            if record.epoch is not None:
+                records_by_field.setdefault(record.field, []).append(record)
+
+        for field, field_records in records_by_field.items():
+            _set_final_indexes(field_records, self.insertions.get(field, []))
+
+        return records
+
+
+def _set_final_indexes(records, insertions):
+    """Set the index of every record after all the insertions in a field.
+
+    The field is seen as a list with enough original slots to contain every
+    index, in which each insertion adds a slot. Going through the insertions
+    backwards, the slot added by the insertion at ``p`` ends up at the
+    ``p``-th position still free in the final list, which is found with a
+    Fenwick tree. The original slots then fill the free positions in order.
+    """
+    size = max([record.index for record in records] + insertions)
+    size += 1 + len(insertions)
+    tree = [0] + [idx & -idx for idx in range(1, size + 1)]
+    inserted_indexes = [None] * len(insertions)
+    for epoch in range(len(insertions), 0, -1):
+        inserted_indexes[epoch - 1] = _fenwick_pop(tree, insertions[epoch - 1] + 1)
+
+    occupied = set(inserted_indexes)
+    original_indexes = [idx for idx in range(size) if idx not in occupied]
+    for record in records:
+        if record.epoch == 0:
+            record.index = original_indexes[record.index]
+        else:
+            record.index = inserted_indexes[record.epoch - 1]
+
+
+def _fenwick_pop(tree, rank):
+    """Find the 0-based position of the ``rank``-th one and set it to zero."""
+    position = 0
+    step = 1 << ((len(tree) - 1).bit_length() - 1)
+    while step:
+        if position + step < len(tree) and tree[position + step] < rank:
+            position += step
+            rank -= tree[position]
+        step >>= 1
+    idx = position + 1
+    while idx < len(tree):
+        tree[idx] -= 1
+        idx += idx & -idx
+    return position
+
+
+def _with_index(conflict, index):
+    conflict_type, path, content = conflict
+    return Conflict(conflict_type, (path[0], index) + tuple(path[2:]), content)
+
+
+def _process_add_back_to_head(conflict, merged, authors=None):
     """Process ADD_BACK_TO_HEAD conflicts differently than other conflicts.
 
     Replace all ADD_BACK_TO_HEAD conflicts to became REMOVE_FIELD conflicts
     also adds value from conflict back to merged_root
     REMOVE_FIELD conflict now points to proper element on list.
+    If given, ``authors`` is the ``OrderKeyIndex`` of ``merged["authors"]``.
     """
     conflict_type, conflict_location, conflict_content = conflict
     if conflict_location[0] == "authors":
-        position, merged["authors"] = _insert_to_list(
-            conflict_content, merged["authors"]
-        )
+        position, merged["authors"] = _insert_author(conflict_content, merged, authors)
         insert_path = ("authors", position)
         new_conflict = Conflict("REMOVE_FIELD", insert_path, None)
         return new_conflict, merged
@@ -232,21 +431,127 @@ def _is_conflict_duplicated(conflict, possible_duplicates):
     )
 
 
-def _process_author_manual_merge_conflict(conflict, merged):
+def _process_author_manual_merge_conflict(conflict, merged, authors=None):
     """Process author `MANUAL_MERGE` conflict.
 
     Conflict object is an tuple containing:
     (conflict_type, conflict_location, conflict_data)
     where `conflict_data` is a tuple of: (ROOT, HEAD, UPDATE).
+    If given, ``authors`` is the ``OrderKeyIndex`` of ``merged["authors"]``.
     """
     _, _, (root, head, update) = conflict
-    if head and head not in merged["authors"]:
-        position, merged["authors"] = _insert_to_list(head, merged["authors"])
+    if head and head not in (merged["authors"] if authors is None else authors):
+        position, merged["authors"] = _insert_author(head, merged, authors)
         new_conflict = Conflict("SET_FIELD", ("authors", position), update)
         return new_conflict, merged, head
     return None, merged, head
 
 
+def _insert_author(item, merged, authors):
+    if authors is None:
+        return _insert_to_list(item, merged["authors"])
+    return authors.insert(item)
+
+
+class OrderKeyIndex(object):
+    """Insert items in a list where ``_insert_to_list`` would, without scanning it.
+
+    The ``ORDER_KEY`` of the elements of the list is kept in blocks of about
+    ``block_size`` elements, together with the largest key in each block and
+    whether some of its elements have no key. Finding the insertion position
+    then only needs to look inside the first block which can contain it, and
+    each insertion updates a single block.
+
+    Membership tests with ``in`` look the item up in a multiset of the frozen
+    elements of the list instead of comparing it with each of them.
+
+    The list must only be changed through ``insert`` after creating the index.
+    """
+
+    def __init__(self, objects_list, block_size=64):
+        self.objects_list = objects_list
+        self.block_size = block_size
+        keys = [_get_order_key(element) for element in objects_list]
+        self.blocks = [
+            keys[start : start + block_size]
+            for start in range(0, len(keys), block_size)
+        ] or [[]]
+        self.max_keys = [_max_order_key(block) for block in self.blocks]
+        self.without_keys = [None in block for block in self.blocks]
+        self._members = None
+
+    def __contains__(self, item):
+        try:
+            if self._members is None:
+                self._members = Counter(
+                    freeze(element) for element in self.objects_list
+                )
+            return self._members[freeze(item)] > 0
+        except TypeError:
+            return item in self.objects_list
+
+    def insert(self, item, position=None):
+        """Same as ``_insert_to_list(item, objects_list, position)``."""
+        item = thaw(item)
+        if not position and ORDER_KEY in item:
+            position = item[ORDER_KEY]
+        idx = len(self.objects_list) if position is None else self._find(position)
+        self.objects_list.insert(idx, item)
+        self._insert_key(idx, _get_order_key(item))
+        if self._members is not None:
+            try:
+                self._members[freeze(item)] += 1
+            except TypeError:
+                self._members = None
+        return idx, self.objects_list
+
+    def _find(self, position):
+        """Index of the first element with a larger key, or without a key and
+        after ``position``."""
+        start = 0
+        for block, max_key, without_keys in zip(
+            self.blocks, self.max_keys, self.without_keys
+        ):
+            end = start + len(block)
+            if max_key > position or (without_keys and end - 1 > position):
+                for idx, key in enumerate(block, start):
+                    if key is None:
+                        if idx > position:
+                            return idx
+                    elif key > position:
+                        return idx
+            start = end
+        return start
+
+    def _insert_key(self, idx, key):
+        start = 0
+        for number, block in enumerate(self.blocks):
+            if idx <= start + len(block) or number == len(self.blocks) - 1:
+                break
+            start += len(block)
+        block.insert(idx - start, key)
+        if key is None:
+            self.without_keys[number] = True
+        elif key > self.max_keys[number]:
+            self.max_keys[number] = key
+
+        if len(block) > 2 * self.block_size:
+            halves = [block[: self.block_size], block[self.block_size :]]
+            self.blocks[number : number + 1] = halves
+            self.max_keys[number : number + 1] = [_max_order_key(b) for b in halves]
+            self.without_keys[number : number + 1] = [None in b for b in halves]
+
+
+def _get_order_key(element):
+    if isinstance(element, Iterable) and ORDER_KEY in element:
+        return element[ORDER_KEY]
+    return None
+
+
+def _max_order_key(keys):
+    return max([key for key in keys if key is not None] or [float("-inf")])
+
+
 def _insert_to_list(item, objects_list, position=None):
     """Inserts value into list at proper position (as close to requested
         position as possible but not before it).
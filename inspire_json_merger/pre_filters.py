@@ -27,11 +27,15 @@ from __future__ import absolute_import, division, print_function
 from functools import partial
 
 import pyrsistent
-from inspire_utils.record import get_value
-from pyrsistent import freeze, ny, pmap, thaw
+from pyrsistent import freeze, ny, pmap
 from six.moves import zip
 
-from inspire_json_merger.utils import ORDER_KEY
+from inspire_json_merger.utils import (
+    ORDER_KEY,
+    canonical_hash,
+    get_persistent_value,
+    uses_fields,
+)
 
 FIELDS_WITH_MATERIAL_KEY = [
     'dois',
@@ -71,15 +75,14 @@ def keep_only_update_source_in_field(field, root, head, update):
         tuple: ``(root, head, update)`` with some elements filtered out from
             ``root`` and ``head``.
     """
-    update_thawed = thaw(update)
     update_sources = {
         source.lower()
-        for source in get_value(update_thawed, '.'.join([field, 'source']), [])
+        for source in get_persistent_value(update, '.'.join([field, 'source']), [])
     }
     if not update_sources:
         # If there is no field or source then fallback for source to
         # `aquisition_source.source`
-        source = get_value(update_thawed, "acquisition_source.source")
+        source = get_persistent_value(update, "acquisition_source.source")
         if source:
             update_sources = {source.lower()}
     if len(update_sources) != 1:
@@ -94,6 +97,7 @@ def keep_only_update_source_in_field(field, root, head, update):
     return root, head, update
 
 
+@uses_fields('references')
 def filter_curated_references(root, head, update):
     """Remove references from either ``head`` or ``update`` depending on curation.
 
@@ -126,6 +130,7 @@ def filter_curated_references(root, head, update):
     return root, head, update
 
 
+@uses_fields('references')
 def filter_publisher_references(root, head, update):
     """Remove references from ``update`` if there are any in ``head``.
 
@@ -139,6 +144,7 @@ def filter_publisher_references(root, head, update):
     return root, head, update
 
 
+@uses_fields('authors')
 def update_authors_with_ordering_info(root, head, update):
     """Adds ordering information into authors entries.
 
@@ -166,68 +172,94 @@ def _update_authors_list_with_ordering_data(input_list):
     )
 
 
-def are_references_curated(root_refs, head_refs):
+def are_references_curated(root_refs, head_refs, root_fingerprints=None):
+    """Tell whether the references in head were curated.
+
+    Args:
+        root_refs (list): the references in the root record.
+        head_refs (list): the references in the head record.
+        root_fingerprints (list): the ``get_references_fingerprints`` of
+            ``root_refs``, if the caller already has them, e.g. when checking
+            several heads against the same root. ``filter_curated_references``
+            computes them, as pre-filters only get the records.
+    """
     if not root_refs:
         return any('legacy_curated' in head_ref for head_ref in head_refs)
 
     if len(root_refs) != len(head_refs):
         return True
 
-    return not all(
-        ref_almost_equal(root, head) for root, head in zip(root_refs, head_refs)
+    if root_fingerprints is None:
+        root_fingerprints = (get_reference_fingerprint(ref) for ref in root_refs)
+
+    return any(
+        fingerprint != get_reference_fingerprint(head)
+        for fingerprint, head in zip(root_fingerprints, head_refs)
     )
 
 
-def ref_almost_equal(root_ref, head_ref):
-    return _normalize_ref(root_ref) == _normalize_ref(head_ref)
+def get_reference_fingerprint(ref):
+    """Hash the parts of a reference which are relevant to curation.
 
+    ``record``, ``raw_refs``, a falsy ``curated_relation`` and the ``misc`` and
+    ``authors`` of ``reference`` are ignored, so two references get the same
+    fingerprint exactly when they are equal apart from them. The reference can
+    be a plain or a persistent structure.
+    """
+    fingerprint = {
+        key: value
+        for key, value in ref.items()
+        if key not in ('record', 'raw_refs', 'reference')
+        and (key != 'curated_relation' or value)
+    }
+    fingerprint['reference'] = {
+        key: value
+        for key, value in (ref.get('reference') or {}).items()
+        if key not in ('misc', 'authors')
+    }
+    return canonical_hash(fingerprint)
 
-def _normalize_ref(ref):
-    ref = _remove_if_present(ref, 'record')
-    ref = _remove_if_falsy(ref, 'curated_relation')
-    ref = _remove_if_present(ref, 'raw_refs')
-    ref = ref.transform(
-        ['reference'], lambda reference: _remove_if_present(reference, 'misc')
-    )
-    ref = ref.transform(
-        ['reference'], lambda reference: _remove_if_present(reference, 'authors')
-    )
-    return ref
 
+def get_references_fingerprints(references):
+    """Get the ``get_reference_fingerprint`` of every reference.
 
-def _remove_if_present(pmap, key):
-    try:
-        return pmap.remove(key)
-    except KeyError:
-        return pmap
+    They can be passed to ``are_references_curated`` as ``root_fingerprints``
+    to compare the same root references with several heads.
+    """
+    return [get_reference_fingerprint(ref) for ref in references]
 
 
-def _remove_if_falsy(pmap, key):
+def _remove_if_present(pmap, key):
     try:
-        if not pmap[key]:
-            return pmap.remove(key)
-        return pmap
+        return pmap.remove(key)
     except KeyError:
         return pmap
 
 
+@uses_fields("references")
 def remove_references_from_update(root, head, update):
     update = _remove_if_present(update, "references")
     return root, head, update
 
 
+@uses_fields("acquisition_source")
 def clean_root_for_acquisition_source(root, head, update):
     if root.get("acquisition_source"):
         root = root.remove("acquisition_source")
     return root, head, update
 
 
-filter_documents_same_source = partial(keep_only_update_source_in_field, 'documents')
-filter_figures_same_source = partial(keep_only_update_source_in_field, 'figures')
+filter_documents_same_source = uses_fields('documents', 'acquisition_source')(
+    partial(keep_only_update_source_in_field, 'documents')
+)
+filter_figures_same_source = uses_fields('figures', 'acquisition_source')(
+    partial(keep_only_update_source_in_field, 'figures')
+)
 
 
+@uses_fields(*FIELDS_WITH_MATERIAL_KEY)
 def update_material(root, head, update):
-    if "erratum" in get_value(thaw(update), 'dois.material', []):
+    if "erratum" in get_persistent_value(update, 'dois.material', []):
         return root, head, update
     for field in FIELDS_WITH_MATERIAL_KEY:
         if field in update:
@@ -237,10 +269,12 @@ def update_material(root, head, update):
     return root, head, update
 
 
+@uses_fields()
 def remove_root(root, head, update):
     return pmap({}), head, update
 
 
+@uses_fields("preprint_date")
 def remove_root_preprint_date(root, head, update):
     "Workaround for arXiv bug in new OAI-PMH API"
     root = _remove_if_present(root, "preprint_date")
@@ -24,10 +24,14 @@
 
 from __future__ import absolute_import, division, print_function
 
+import hashlib
+import json
 import re
+import threading
+from collections import OrderedDict
 
 import six
-from pyrsistent import freeze, thaw
+from pyrsistent import PMap, PVector, freeze, pmap, thaw
 from six.moves import zip
 
 split_on_re = re.compile(r'[\.\s-]')
@@ -35,6 +39,60 @@ split_on_re = re.compile(r'[\.\s-]')
 ORDER_KEY = "__pos"
 
 
+class LRUCache(object):
+    """Thread-safe cache keeping the ``maxsize`` most recently used items.
+
+    Lookups are counted in ``hits`` and ``misses`` to help sizing the cache.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._items.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._items[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = value
+            if len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._items.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """Return a dict with the cache statistics and size."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'maxsize': self.maxsize,
+            'size': len(self._items),
+        }
+
+
 def scan_author_string_for_phrases(s):
     """Scan a name string and output an object representing its structure.
     Example:
@@ -100,15 +158,60 @@ def filter_conflicts(conflicts_list, fields):
     Params:
         conflicts_list(List[Conflict]): the list of conflicts to filter.
         fields(List[str]): fields to filter out, using an accessor syntax of
-            the form ``field.subfield.subsubfield``.
+            the form ``field.subfield.subsubfield``, or a trie of them built
+            by ``compile_conflict_filters``.
 
     Return:
         List[Conflict]: the given list filtered by `fields`
     """
+    trie = fields if isinstance(fields, dict) else compile_conflict_filters(fields)
+
+    return [conf for conf in conflicts_list if not is_to_delete_by_trie(conf, trie)]
+
+
+_TRIE_LEAF = None
+
+
+def compile_conflict_filters(fields):
+    """Build a prefix trie of the paths in ``fields``, keyed by path segment.
+
+    Example:
+        compile_conflict_filters(['authors.full_name', 'authors.ids', 'core'])
+
+        {
+            'authors': {'full_name': {None: True}, 'ids': {None: True}},
+            'core': {None: True},
+        }
+    """
+    trie = {}
     for field in fields:
-        conflicts_list = filter_conflicts_by_path(conflicts_list, field)
+        node = trie
+        for key in field.split('.'):
+            node = node.setdefault(key, {})
+        node[_TRIE_LEAF] = True
+
+    return trie
+
+
+def is_to_delete_by_trie(conflict, trie):
+    """Check if any of the paths in the trie is a prefix of the conflict path.
+
+    This is the same as ``is_to_delete`` for every path in the trie.
+    """
+    if conflict[0] == 'MANUAL_MERGE':
+        return False
 
-    return conflicts_list
+    node = trie
+    for key in conflict[1]:
+        if isinstance(key, int):
+            continue
+        node = node.get(key)
+        if node is None:
+            return False
+        if _TRIE_LEAF in node:
+            return True
+
+    return False
 
 
 def filter_conflicts_by_path(conflict_list, to_delete_path):
@@ -142,10 +245,162 @@ def conflict_to_list(conflict):
     return [p for p in path if not isinstance(p, int)]
 
 
+def get_persistent_value(record, path, default=None):
+    """Get a value from a record made of persistent structures.
+
+    It behaves like ``inspire_utils.record.get_value`` with a dotted ``path``,
+    but the record does not need to be thawed: when a list is met along the
+    path, the rest of the path is looked up in each of its elements, skipping
+    those where it is missing, and the results are collected in a list.
+
+    Example:
+        >>> get_persistent_value(freeze(record), 'dois.material', [])
+        ['erratum', 'publication']
+    """
+    value = record
+    for key in path.split('.'):
+        try:
+            value = _get_persistent_item(value, key)
+        except KeyError:
+            return default
+
+    return value
+
+
+def _get_persistent_item(value, key):
+    if isinstance(value, (dict, PMap)):
+        return value[key]
+    if isinstance(value, (list, tuple, PVector)):
+        items = []
+        for item in value:
+            try:
+                items.append(_get_persistent_item(item, key))
+            except KeyError:
+                continue
+        return items
+    raise KeyError(key)
+
+
+def uses_fields(*fields):
+    """Declare the top-level fields that a pre-filter reads or modifies.
+
+    Example:
+        @uses_fields('references')
+        def remove_references_from_update(root, head, update):
+            ...
+    """
+
+    def decorator(filter_):
+        filter_.fields = frozenset(fields)
+        return filter_
+
+    return decorator
+
+
+def get_filters_fields(filters):
+    """Get the top-level fields used by ``filters``.
+
+    Return:
+        set: the union of the fields declared with ``uses_fields``, or
+        ``None`` if at least one of the filters did not declare them.
+    """
+    fields = set()
+    for filter_ in filters:
+        filter_fields = getattr(filter_, 'fields', None)
+        if filter_fields is None:
+            return None
+        fields.update(filter_fields)
+
+    return fields
+
+
 def filter_records(root, head, update, filters=()):
-    """Apply the filters to the records."""
-    root, head, update = freeze(root), freeze(head), freeze(update)
+    """Apply the filters to the records.
+
+    If all the filters declared their fields with ``uses_fields``, only those
+    fields are converted to persistent structures and back, while the others
+    are passed through untouched. Otherwise the whole records are converted.
+    """
+    fields = get_filters_fields(filters)
+    if fields is None:
+        root, head, update = freeze(root), freeze(head), freeze(update)
+        for filter_ in filters:
+            root, head, update = filter_(root, head, update)
+
+        return thaw(root), thaw(head), thaw(update)
+
+    root, head, update = (
+        _freeze_fields(record, fields) for record in (root, head, update)
+    )
     for filter_ in filters:
         root, head, update = filter_(root, head, update)
 
-    return thaw(root), thaw(head), thaw(update)
+    return tuple(_thaw_fields(record, fields) for record in (root, head, update))
+
+
+def canonical_hash(obj):
+    """Hash a JSON-like object so that equal objects get equal hashes.
+
+    Keys are sorted before hashing, so the hash does not depend on the order
+    in which they were inserted. Persistent structures hash like the plain
+    ones they thaw to.
+    """
+    serialized = json.dumps(
+        obj, sort_keys=True, separators=(',', ':'), default=_persistent_to_builtin
+    )
+    return hashlib.sha1(serialized.encode('utf-8')).hexdigest()
+
+
+def _persistent_to_builtin(obj):
+    if isinstance(obj, PMap):
+        return dict(obj.items())
+    if isinstance(obj, PVector):
+        return list(obj)
+    raise TypeError('{!r} is not JSON serializable'.format(obj))
+
+
+def get_fields_hashes(record):
+    """Get the ``canonical_hash`` of every top-level field of ``record``."""
+    return {key: canonical_hash(value) for key, value in six.iteritems(record)}
+
+
+def get_fields_kept_from_head(root, head, update):
+    """Get the top-level fields whose merged value is the one in head.
+
+    These are the fields which are identical in root and update and contain
+    no lists in any of the three records: their three-way merge keeps head's
+    value without conflicts. Fields with lists are never returned, because the
+    comparators can pair their entries in unexpected ways, for example if an
+    entry is duplicated, even when root and update are identical.
+    """
+    return {
+        key
+        for key in set(root) | set(head) | set(update)
+        if (key in root) == (key in update)
+        and not any(_contains_list(record.get(key)) for record in (root, head, update))
+        and canonical_hash(root.get(key)) == canonical_hash(update.get(key))
+    }
+
+
+def _contains_list(value):
+    if isinstance(value, (list, tuple)):
+        return True
+    if isinstance(value, dict):
+        return any(_contains_list(item) for item in six.itervalues(value))
+    return False
+
+
+def _freeze_fields(record, fields):
+    return pmap(
+        {
+            key: freeze(value) if key in fields else value
+            for key, value in six.iteritems(record)
+        }
+    )
+
+
+def _thaw_fields(record, fields):
+    return {
+        key: thaw(value) if key in fields else value
+        for key, value in six.iteritems(record)
+    }
@@ -57,6 +57,7 @@ dev_require = [
 
 extras_require = {
     'docs': docs_require,
+    'scipy': ['scipy'],
     'tests': tests_require,
     'dev': dev_require,
 }
@@ -22,19 +22,29 @@
 
 from __future__ import absolute_import, division, print_function
 
+import copy
 import json
+import multiprocessing
 import operator
 import os
+import pickle
+from multiprocessing.pool import ThreadPool
 from operator import itemgetter
 
 import pytest
+from json_merger.config import UnifierOps
 from utils import assert_ordered_conflicts, validate_subschema
 
+from inspire_json_merger import api
 from inspire_json_merger.api import (
     get_acquisition_source,
     get_configuration,
+    get_configurations,
     get_head_source,
+    is_erratum,
     merge,
+    merge_iter,
+    merge_many,
 )
 from inspire_json_merger.config import (
     ArxivOnArxivOperations,
@@ -314,6 +324,57 @@ def test_get_configuration(
     assert get_configuration(arxiv1, arxiv2) == ArxivOnArxivOperations
 
 
+def test_get_configurations_matches_get_configuration(
+    arxiv_record, publisher_record, erratum_1, erratum_2, erratum_3, erratum_4
+):
+    not_erratum = dict(
+        publisher_record,
+        titles=[{'title': 'Publisher'}, {'title': 'Note and a correction to: X'}],
+    )
+    split_prefix = dict(
+        publisher_record, titles=[{'title': 'Correction'}, {'title': 'to: X'}]
+    )
+    pairs = [
+        (arxiv_record, arxiv_record),
+        (arxiv_record, publisher_record),
+        (publisher_record, erratum_1),
+        (arxiv_record, erratum_2),
+        (publisher_record, not_erratum),
+        (publisher_record, erratum_3),
+        (publisher_record, erratum_4),
+        (dict(publisher_record, control_number=1), dict(erratum_4, control_number=2)),
+        (publisher_record, split_prefix),
+    ]
+
+    expected = [get_configuration(head, update) for head, update in pairs]
+
+    assert get_configurations(pairs) == expected
+    assert expected[2:7] == [
+        ErratumOnPublisherOperations,
+        ErratumOnPublisherOperations,
+        PublisherOnPublisherOperations,
+        ErratumOnPublisherOperations,
+        ErratumOnPublisherOperations,
+    ]
+    assert expected[-1] == PublisherOnPublisherOperations
+
+
+def test_is_erratum_uses_registered_rules(monkeypatch, publisher_record):
+    def has_erratum_note(update):
+        return 'Erratum' in update.get('public_notes', [])
+
+    update = dict(publisher_record, public_notes=['Erratum'])
+
+    assert not is_erratum(update)
+
+    monkeypatch.setattr(api, 'ERRATUM_RULES', api.ERRATUM_RULES + [has_erratum_note])
+
+    assert is_erratum(update)
+    assert get_configurations([(publisher_record, update)]) == [
+        ErratumOnPublisherOperations
+    ]
+
+
 def test_get_configuration_without_acquisition_source(arxiv_record, publisher_record):
     arxiv1 = dict(arxiv_record)
     arxiv1['control_number'] = 1
@@ -660,3 +721,238 @@ def test_grobid_on_arxiv_operations_keeps_authors_from_head():
     )
     assert not conflicts
     assert merged == expected_merged
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_merge_many_matches_merge(workers, arxiv_record, publisher_record):
+    triples = [
+        ({}, arxiv_record, publisher_record),
+        ({}, publisher_record, arxiv_record),
+        (arxiv_record, arxiv_record, arxiv_record),
+    ]
+    expected = [merge(*triple) for triple in triples]
+
+    result = merge_many(triples, workers=workers, chunksize=2)
+
+    assert result == expected
+
+
+def test_merge_many_returns_exceptions_in_place(arxiv_record):
+    triples = [
+        ({}, arxiv_record, arxiv_record),
+        ({}, None, arxiv_record),
+        ({}, arxiv_record, arxiv_record),
+    ]
+
+    result = merge_many(triples, workers=2)
+
+    assert result[0] == merge({}, arxiv_record, arxiv_record)
+    assert isinstance(result[1], TypeError)
+    assert result[2] == result[0]
+
+
+def test_merge_many_uses_given_configuration(arxiv_record, publisher_record):
+    triples = [({}, arxiv_record, publisher_record)]
+    expected = merge(
+        {}, arxiv_record, publisher_record, configuration=ManualMergeOperations
+    )
+
+    result = merge_many(triples, workers=1, configuration=ManualMergeOperations)
+
+    assert result == [expected]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_merge_iter_consumes_input_lazily(workers, arxiv_record):
+    consumed = []
+
+    def triples():
+        for idx in range(10):
+            consumed.append(idx)
+            yield {}, arxiv_record, arxiv_record
+
+    results = merge_iter(triples(), workers=workers, window=1)
+    first = next(results)
+
+    assert first == merge({}, arxiv_record, arxiv_record)
+    assert len(consumed) <= 2
+    assert len(list(results)) == 9
+    assert len(consumed) == 10
+
+
+def test_merge_skip_unchanged_returns_head_if_update_equals_root(arxiv_record):
+    root = {'titles': [{'title': 'A title'}], 'core': True}
+    update = {'core': True, 'titles': [{'title': 'A title'}]}
+
+    merged, conflict = merge(root, arxiv_record, update, skip_unchanged=True)
+
+    assert merged == arxiv_record
+    assert merged is not arxiv_record
+    assert conflict == []
+
+
+def test_merge_skip_unchanged_keeps_head_for_fields_identical_in_update():
+    authors = [{'full_name': 'Smith, John'}, {'full_name': 'Doe, Jane'}]
+    root = {'authors': authors, 'titles': [{'title': 'Old title'}]}
+    head = {'authors': authors[:1], 'titles': [{'title': 'Old title'}]}
+    update = {'authors': authors, 'titles': [{'title': 'New title'}]}
+
+    expected_merged, expected_conflict = merge(root, head, update, head_source='arxiv')
+
+    assert expected_merged['authors'] == authors
+
+    merged, conflict = merge(
+        root, head, update, head_source='arxiv', skip_unchanged=True
+    )
+
+    assert merged == dict(expected_merged, authors=authors[:1])
+    assert conflict == expected_conflict
+
+
+def test_merge_skip_unchanged_does_not_share_objects_with_inputs():
+    root = {
+        'authors': [{'full_name': 'Smith, John'}, {'full_name': 'Doe, Jane'}],
+        'titles': [{'title': 'Old title'}],
+    }
+    head = {
+        'authors': [{'full_name': 'Smith, John', 'emails': ['smith@cern.ch']}],
+        'titles': [{'title': 'Old title'}],
+    }
+    update = {
+        'authors': [{'full_name': 'Smith, John'}, {'full_name': 'Doe, Jane'}],
+        'titles': [{'title': 'New title'}],
+    }
+    records = root, head, update
+    expected_records = copy.deepcopy(records)
+
+    merged, _ = merge(root, head, update, head_source='arxiv', skip_unchanged=True)
+    merged['authors'][0]['full_name'] = 'Doe, John'
+    merged['authors'].append({'full_name': 'Roe, Richard'})
+    unchanged, _ = merge(root, head, root, head_source='arxiv', skip_unchanged=True)
+    unchanged['titles'][0]['title'] = 'Another title'
+
+    assert records == expected_records
+
+
+@pytest.mark.parametrize(
+    'configuration', [ArxivOnArxivOperations, PublisherOnPublisherOperations]
+)
+def test_merge_incremental_does_not_share_objects_with_inputs(configuration):
+    root = {
+        'book_series': {'title': 'Lectures in Testing', 'volume': '2'},
+        'titles': [{'title': 'Old title'}],
+    }
+    head = {
+        'book_series': {'title': 'Lectures in Testing', 'volume': '3'},
+        'titles': [{'title': 'Old title'}],
+    }
+    update = {
+        'book_series': {'title': 'Lectures in Testing', 'volume': '2'},
+        'titles': [{'title': 'New title'}],
+    }
+    records = root, head, update
+    expected_records = copy.deepcopy(records)
+
+    merged, _ = merge(root, head, update, configuration=configuration, incremental=True)
+    merged['book_series']['title'] = 'MUTATED'
+    for title in merged['titles']:
+        title['title'] = 'MUTATED'
+
+    assert records == expected_records
+
+
+@pytest.mark.parametrize(
+    'configuration',
+    [
+        ArxivOnArxivOperations,
+        ArxivOnPublisherOperations,
+        ErratumOnPublisherOperations,
+        GrobidOnArxivAuthorsOperations,
+        ManualMergeOperations,
+        PublisherOnArxivOperations,
+        PublisherOnPublisherOperations,
+    ],
+)
+def test_merge_incremental_matches_full_merge(
+    configuration, arxiv_record, publisher_record
+):
+    root = dict(arxiv_record, core=False, preprint_date='2017-10-16')
+    head = dict(publisher_record, core=True, citeable=True)
+    update = dict(arxiv_record, core=False, preprint_date='2017-10-17')
+
+    expected = merge(root, head, update, configuration=configuration)
+    result = merge(root, head, update, configuration=configuration, incremental=True)
+
+    assert result == expected
+
+
+@pytest.mark.parametrize('pool_class', [ThreadPool, multiprocessing.Pool])
+def test_merge_in_pool_matches_merge(pool_class):
+    root = {
+        'authors': [{'full_name': 'Smith, J.'}],
+        'titles': [{'title': 'Old title'}],
+        'book_series': [{'title': 'Lectures in Testing', 'volume': '2'}],
+        'core': False,
+        'number_of_pages': 10,
+        'preprint_date': '2017-10-16',
+    }
+    head = {
+        'authors': [{'full_name': 'Smith, John'}],
+        'titles': [{'title': 'Old title'}, {'title': 'Curated title'}],
+        'core': True,
+        'number_of_pages': 11,
+        'preprint_date': '2017-10-17',
+    }
+    update = {
+        'authors': [{'full_name': 'Smith, J.'}, {'full_name': 'Doe, Jane'}],
+        'titles': [{'title': 'New title'}],
+        'book_series': [{'title': 'Lectures in Testing', 'volume': '3'}],
+        'core': False,
+        'citeable': True,
+        'number_of_pages': 12,
+        'preprint_date': '2017-10-18',
+    }
+    expected_merged, expected_conflict = merge(
+        root, head, update, configuration=ManualMergeOperations
+    )
+
+    assert expected_conflict
+
+    pool = pool_class(2)
+    try:
+        merged, conflict = merge(
+            root, head, update, configuration=ManualMergeOperations, pool=pool
+        )
+    finally:
+        pool.terminate()
+
+    assert merged == expected_merged
+    assert conflict == expected_conflict
+
+
+def test_compile_returns_cached_plan_until_rules_change():
+    class Operations(PublisherOnPublisherOperations):
+        list_merge_ops = dict(PublisherOnPublisherOperations.list_merge_ops)
+
+    plan = Operations.compile()
+
+    assert Operations.compile() is plan
+    assert plan.compile() is plan
+    assert plan.list_merge_ops['keywords'] == Operations.default_list_merge_op
+
+    Operations.list_merge_ops['keywords'] = UnifierOps.KEEP_ONLY_HEAD_ENTITIES
+    new_plan = Operations.compile()
+
+    assert new_plan is not plan
+    assert new_plan.list_merge_ops['keywords'] == UnifierOps.KEEP_ONLY_HEAD_ENTITIES
+
+
+def test_merge_accepts_compiled_plan(arxiv_record, publisher_record):
+    plan = pickle.loads(pickle.dumps(ManualMergeOperations.compile()))
+
+    result = merge({}, arxiv_record, publisher_record, configuration=plan)
+
+    assert plan == ManualMergeOperations.compile()
+    assert result == merge(
+        {}, arxiv_record, publisher_record, configuration=ManualMergeOperations
+    )
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import time
+from multiprocessing.pool import ThreadPool
+
+from json_merger.config import UnifierOps
+
+from inspire_json_merger import cache as cache_module
+from inspire_json_merger.api import merge
+from inspire_json_merger.cache import (
+    MemoryMergeCache,
+    SQLiteMergeCache,
+    get_merge_key,
+    get_rules_digest,
+)
+from inspire_json_merger.config import (
+    ArxivOnArxivOperations,
+    ManualMergeOperations,
+    PublisherOnArxivOperations,
+)
+
+ROOT = {'authors': [{'full_name': 'Smith, J.'}], 'core': True}
+HEAD = {'authors': [{'full_name': 'Smith, J.'}], 'core': False}
+UPDATE = {'authors': [{'full_name': 'Smith, John'}], 'core': True}
+
+
+def test_get_merge_key():
+    key = get_merge_key(ROOT, HEAD, UPDATE, PublisherOnArxivOperations)
+    reordered_head = {'core': False, 'authors': [{'full_name': 'Smith, J.'}]}
+
+    assert key == get_merge_key(
+        ROOT, reordered_head, UPDATE, PublisherOnArxivOperations
+    )
+    assert key == get_merge_key(
+        ROOT, HEAD, UPDATE, PublisherOnArxivOperations.compile()
+    )
+    assert key != get_merge_key(ROOT, HEAD, UPDATE, ArxivOnArxivOperations)
+    assert key != get_merge_key(ROOT, UPDATE, HEAD, PublisherOnArxivOperations)
+    assert key != get_merge_key(
+        ROOT, HEAD, UPDATE, PublisherOnArxivOperations, skip_unchanged=True
+    )
+
+
+def test_get_merge_key_changes_with_version_and_rules(monkeypatch):
+    class Operations(ArxivOnArxivOperations):
+        list_merge_ops = dict(ArxivOnArxivOperations.list_merge_ops)
+
+    key = get_merge_key(ROOT, HEAD, UPDATE, Operations)
+    digest = get_rules_digest(Operations)
+
+    assert digest == get_rules_digest(ArxivOnArxivOperations)
+    assert get_merge_key(ROOT, HEAD, UPDATE, Operations) == key
+
+    authors_op = Operations.list_merge_ops['authors']
+    Operations.list_merge_ops['authors'] = UnifierOps.KEEP_ONLY_UPDATE_ENTITIES
+
+    assert get_rules_digest(Operations) != digest
+    assert get_merge_key(ROOT, HEAD, UPDATE, Operations) != key
+
+    Operations.list_merge_ops['authors'] = authors_op
+    monkeypatch.setattr(cache_module, '__version__', '0.0.0')
+
+    assert get_rules_digest(Operations) == digest
+    assert get_merge_key(ROOT, HEAD, UPDATE, Operations) != key
+
+
+def test_merge_with_cache():
+    cache = MemoryMergeCache()
+    expected = merge(ROOT, HEAD, UPDATE)
+
+    assert merge(ROOT, HEAD, UPDATE, cache=cache) == expected
+    result = merge(ROOT, HEAD, UPDATE, cache=cache)
+    assert result == expected
+    result[0]['core'] = None
+    assert merge(ROOT, HEAD, UPDATE, cache=cache) == expected
+    assert cache.info() == {
+        'hits': 2,
+        'misses': 1,
+        'hit_rate': 2 / 3,
+        'maxsize': 1024,
+        'size': 1,
+    }
+
+
+def test_merge_with_cache_does_not_depend_on_pool_and_incremental():
+    root = dict(ROOT, number_of_pages=10, preprint_date='2017-10-16')
+    head = dict(HEAD, number_of_pages=11, preprint_date='2017-10-17')
+    update = dict(UPDATE, number_of_pages=12, preprint_date='2017-10-18')
+    cache = MemoryMergeCache()
+    expected = merge(root, head, update, configuration=ManualMergeOperations)
+
+    pool = ThreadPool(2)
+    try:
+        result = merge(
+            root,
+            head,
+            update,
+            configuration=ManualMergeOperations,
+            incremental=True,
+            pool=pool,
+            cache=cache,
+        )
+    finally:
+        pool.terminate()
+
+    assert len(expected[1]) > 1
+    assert result == expected
+    assert merge(
+        root, head, update, configuration=ManualMergeOperations, cache=cache
+    ) == expected
+    assert cache.hits == 1
+
+
+def test_memory_merge_cache_evicts_expired_and_least_recently_used(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    cache = MemoryMergeCache(maxsize=2, ttl=60)
+    cache.set('a', ({'core': True}, []))
+    cache.set('b', ({'core': False}, []))
+    cache.get('a')
+    cache.set('c', ({}, []))
+
+    assert cache.get('b') is None
+    assert cache.get('a') == ({'core': True}, [])
+    now[0] += 61
+    assert cache.get('c') is None
+    assert len(cache) == 1
+
+
+def test_sqlite_merge_cache_is_persistent(tmpdir):
+    path = str(tmpdir.join('merges.db'))
+    expected = merge(ROOT, HEAD, UPDATE)
+    cache = SQLiteMergeCache(path, maxsize=2)
+    merge(ROOT, HEAD, UPDATE, cache=cache)
+    cache.close()
+
+    cache = SQLiteMergeCache(path, maxsize=2)
+
+    assert merge(ROOT, HEAD, UPDATE, cache=cache) == expected
+    assert cache.info()['hits'] == 1
+    cache.set('a', ({}, []))
+    cache.set('b', ({}, []))
+    assert len(cache) == 2
+    assert cache.get('a') == ({}, [])
@@ -22,12 +22,30 @@
 
 from __future__ import absolute_import, division, print_function
 
+import pytest
 from inspire_schemas.api import load_schema, validate
+from json_merger.comparator import PrimaryKeyComparator
 from json_merger.config import UnifierOps
+from json_merger.contrib.inspirehep.author_util import AuthorNameNormalizer
+from json_merger.contrib.inspirehep.match import distance_function_match
 from utils import assert_ordered_conflicts
 
+from inspire_json_merger import comparators
 from inspire_json_merger.api import merge
-from inspire_json_merger.comparators import IDNormalizer
+from inspire_json_merger.comparators import (
+    AuthorComparator,
+    BlockingAuthorComparator,
+    CachedAuthorNormalizer,
+    CachedTokenizer,
+    DocumentComparator,
+    IDNormalizer,
+    ScipyAuthorComparator,
+    _match_by_norm_func,
+    author_blocking_keys,
+    author_tokenize,
+    munkres_assignment,
+    scipy_assignment,
+)
 from inspire_json_merger.config import ArxivOnArxivOperations
 
 ArxivOnArxivOperations.list_merge_ops[
@@ -74,6 +92,193 @@ def test_id_normalizer():
     assert normalizer(author) == 'J.Smith.1'
 
 
+def test_author_blocking_keys():
+    author = {'full_name': 'Ortín, J. Tomás'}
+
+    expected = {
+        ('prefix', 'or'),
+        ('suffix', 'in'),
+        ('prefix', 'to'),
+        ('suffix', 'as'),
+    }
+
+    assert author_blocking_keys(author) == expected
+
+
+def test_blocking_author_comparator_matches_like_author_comparator():
+    head = [
+        {'full_name': 'Smith, John'},
+        {'full_name': 'Smith, J.'},
+        {'full_name': 'Ortín, Tomás'},
+        {'full_name': 'Picard, Jean-Luc'},
+        {'full_name': 'Janeway, Kathryn'},
+        {'full_name': 'Archer, Jonathan'},
+        {'full_name': 'Li, A. B. C. D.'},
+    ]
+    update = [
+        {'full_name': 'Kathryn Janeway'},
+        {'full_name': 'Smyth, J.'},
+        {'full_name': 'Ortin, Tomas'},
+        {'full_name': 'Pickard, Jean-Luc'},
+        {'full_name': 'Kirk, James'},
+        {'full_name': 'Archer, J.'},
+        {'full_name': 'Smith, John'},
+    ]
+
+    expected = AuthorComparator(head, update).matches
+    result = BlockingAuthorComparator(head, update).matches
+
+    assert result == expected
+    assert len(result) == 6
+
+
+def test_author_comparator_assignment_function():
+    head = [
+        {'full_name': 'Smith, J.'},
+        {'full_name': 'Smyth, J.'},
+        {'full_name': 'Picard, Jean-Luc'},
+    ]
+    update = [
+        {'full_name': 'Smith, J. A.'},
+        {'full_name': 'Smyth, J. B.'},
+        {'full_name': 'Pickard, Jean-Luc'},
+    ]
+    matrices = []
+
+    def assignment(dist_matrix):
+        matrices.append(dist_matrix)
+        return munkres_assignment(dist_matrix)
+
+    class Comparator(AuthorComparator):
+        assignment_function = staticmethod(assignment)
+
+    expected = set(
+        distance_function_match(
+            head,
+            update,
+            AuthorComparator.threshold,
+            AuthorComparator.distance_function,
+            AuthorComparator.norm_functions,
+        )
+    )
+
+    assert Comparator(head, update).matches == expected
+    assert AuthorComparator(head, update).matches == expected
+    assert matrices
+
+
+def test_author_comparator_with_scipy_assignment():
+    pytest.importorskip('scipy')
+    head = [
+        {'full_name': 'Smith, J.'},
+        {'full_name': 'Smyth, J.'},
+        {'full_name': 'Picard, Jean-Luc'},
+        {'full_name': 'Riker, William'},
+    ]
+    update = [
+        {'full_name': 'Pickard, Jean-Luc'},
+        {'full_name': 'Smyth, J. B.'},
+        {'full_name': 'Smith, J. A.'},
+        {'full_name': 'Ryker, William T.'},
+    ]
+    dist_matrix = [[0.3, 0.1, 0.7], [0.2, 0.6, 0.4], [0.5, 0.8, 0.9]]
+
+    assert scipy_assignment(dist_matrix) == munkres_assignment(dist_matrix)
+    assert (
+        ScipyAuthorComparator(head, update).matches
+        == AuthorComparator(head, update).matches
+    )
+
+
+def test_scipy_assignment_falls_back_to_munkres(monkeypatch):
+    monkeypatch.setattr(comparators, 'linear_sum_assignment', None)
+    dist_matrix = [[0.1, 0.2], [0.2, 0.1]]
+
+    assert scipy_assignment(dist_matrix) == munkres_assignment(dist_matrix)
+
+
+def test_match_by_norm_func():
+    l1 = list(enumerate(['X1', 'Y1', 'Y2', 'Z5', 'W1', 'W1']))
+    l2 = list(enumerate(['X1', 'Y3', 'Z1', 'W1', 'W1']))
+
+    common, l1_only, l2_only = _match_by_norm_func(
+        l1,
+        l2,
+        lambda pair: pair[1][0],
+        lambda pair1, pair2: 0 if pair1[1] == pair2[1] else 1,
+        0,
+    )
+
+    assert common == [
+        ((0, 'X1'), (0, 'X1')),
+        ((4, 'W1'), (3, 'W1')),
+        ((5, 'W1'), (4, 'W1')),
+    ]
+    assert l1_only == [(1, 'Y1'), (2, 'Y2'), (3, 'Z5')]
+    assert l2_only == [(1, 'Y3'), (2, 'Z1')]
+
+
+def test_document_comparator_matches_like_pairwise_comparator():
+    class PairwiseDocumentComparator(PrimaryKeyComparator):
+        primary_key_fields = DocumentComparator.primary_key_fields
+
+    head = [
+        {'source': 'arXiv', 'fulltext': True, 'material': 'preprint'},
+        {'source': 'arXiv', 'description': 'v1', 'material': 'preprint'},
+        {'source': 'arXiv', 'original_url': 'http://a.b/c.pdf'},
+        {'key': 'no_primary_key.pdf'},
+        {'source': 'APS', 'description': ['unhashable']},
+    ]
+    update = [
+        {'source': 'arXiv', 'description': 'v1', 'material': 'preprint'},
+        {'source': 'arXiv', 'original_url': 'http://a.b/c.pdf', 'key': 'c.pdf'},
+        {'key': 'no_primary_key.pdf'},
+        {'source': 'APS', 'description': ['unhashable']},
+        {'source': 'arXiv', 'fulltext': True},
+    ]
+
+    expected = PairwiseDocumentComparator(head, update)
+    result = DocumentComparator(head, update)
+
+    assert result.matches == expected.matches
+    for idx in range(len(head)):
+        assert result.get_matches('l1', idx) == expected.get_matches('l1', idx)
+    for idx in range(len(update)):
+        assert result.get_matches('l2', idx) == expected.get_matches('l2', idx)
+
+
+def test_cached_tokenizer_reuses_immutable_tokens():
+    tokenize = CachedTokenizer(author_tokenize, maxsize=10)
+
+    tokens = tokenize('Smith, John')
+
+    assert tokenize('Smith, John') is tokens
+    assert tokens == author_tokenize('Smith, John')
+    assert isinstance(tokens['lastnames'], tuple)
+    assert tokenize.cache.info() == {
+        'hits': 1,
+        'misses': 1,
+        'maxsize': 10,
+        'size': 1,
+    }
+
+
+def test_cached_author_normalizer_reuses_names_across_records():
+    normalizer = AuthorNameNormalizer(author_tokenize, asciify=True)
+    normalize = CachedAuthorNormalizer(normalizer, maxsize=10)
+    head_author = {'full_name': 'Müller, Jörg', 'ids': [{'value': 'J.Muller.1'}]}
+    update_author = {'full_name': 'Müller, Jörg'}
+
+    assert normalize(head_author) == normalizer(head_author)
+    assert normalize(update_author) == normalizer(update_author)
+    assert normalize.cache.info() == {
+        'hits': 1,
+        'misses': 1,
+        'maxsize': 10,
+        'size': 1,
+    }
+
+
 def test_comparing_authors_unicode_name():
     root = {}
     head = {
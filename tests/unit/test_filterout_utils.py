@@ -22,13 +22,22 @@
 
 from __future__ import absolute_import, division, print_function
 
+from inspire_utils.record import get_value
 from json_merger.conflict import Conflict
+from pyrsistent import freeze
 
+from inspire_json_merger.config import MergerConfigurationOperations
 from inspire_json_merger.utils import (
+    LRUCache,
+    canonical_hash,
+    compile_conflict_filters,
     conflict_to_list,
     filter_conflicts,
     filter_conflicts_by_path,
+    get_fields_kept_from_head,
+    get_persistent_value,
     is_to_delete,
+    is_to_delete_by_trie,
 )
 
 
@@ -145,3 +154,79 @@ def test_filter_conflicts():
     ]
     fields = ['authors.affiliations', 'authors.full_name', 'report_numbers']
     assert len(filter_conflicts(conflicts, fields)) == 4
+
+
+def test_is_to_delete_by_trie_matches_is_to_delete():
+    fields = ['authors.affiliations', 'authors.full_name', 'report_numbers', 'core']
+    trie = compile_conflict_filters(fields)
+    conflicts = [
+        Conflict('SET_FIELD', ('authors', 0, 'full_name'), 'John Smith'),
+        Conflict('SET_FIELD', ('authors', 1, 'full_name', 'x'), 'John Smith'),
+        Conflict('SET_FIELD', ('authors', 1), {'full_name': 'John Smith'}),
+        Conflict('SET_FIELD', ('authors', 1, 'full'), 'John Smith'),
+        Conflict('MANUAL_MERGE', ('core',), (True, False, True)),
+        Conflict('SET_FIELD', ('core',), False),
+        Conflict('SET_FIELD', ('corex',), False),
+        ('SET_FIELD', 'report_numbers', 'DESY-17-036'),
+    ]
+
+    for conflict in conflicts:
+        expected = any(is_to_delete(conflict, field) for field in fields)
+        assert is_to_delete_by_trie(conflict, trie) == expected
+
+
+def test_get_conflict_filters_trie_is_cached_until_filters_change():
+    class Operations(MergerConfigurationOperations):
+        conflict_filters = ['authors.full_name']
+
+    trie = Operations.get_conflict_filters_trie()
+
+    assert Operations.get_conflict_filters_trie() is trie
+    Operations.conflict_filters.append('core')
+    assert Operations.get_conflict_filters_trie() == compile_conflict_filters(
+        ['authors.full_name', 'core']
+    )
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.info() == {'hits': 3, 'misses': 1, 'maxsize': 2, 'size': 2}
+
+
+def test_canonical_hash_does_not_depend_on_key_order():
+    first = {'title': 'A title', 'source': 'arXiv'}
+    second = {'source': 'arXiv', 'title': 'A title'}
+
+    assert canonical_hash(first) == canonical_hash(second)
+    assert canonical_hash(first) != canonical_hash(dict(first, title='B title'))
+
+
+def test_get_fields_kept_from_head():
+    root = {'core': True, 'citeable': True, 'titles': [{'title': 'A'}], 'x': {}}
+    head = {'core': False, 'titles': [{'title': 'A'}], 'refereed': True}
+    update = {'core': True, 'citeable': False, 'titles': [{'title': 'A'}], 'x': {}}
+
+    expected = {'core', 'refereed', 'x'}
+
+    assert get_fields_kept_from_head(root, head, update) == expected
+
+
+def test_get_persistent_value_behaves_like_get_value():
+    record = {
+        'dois': [{'value': '10.1/a', 'material': 'erratum'}, {'value': '10.1/b'}],
+        'acquisition_source': {'source': 'arXiv'},
+    }
+    frozen = freeze(record)
+
+    for path in ('dois.material', 'dois.value', 'acquisition_source.source'):
+        assert get_persistent_value(frozen, path) == get_value(record, path)
+    assert get_persistent_value(frozen, 'figures.source', []) == []
+    assert get_persistent_value(frozen, 'acquisition_source.source.x') is None
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+from inspire_json_merger.api import merge
+from inspire_json_merger.config import PublisherOnArxivOperations
+from inspire_json_merger.instrumentation import MergeInstrumentation, get_filter_name
+from inspire_json_merger.pre_filters import (
+    filter_curated_references,
+    filter_documents_same_source,
+)
+
+
+def test_merge_records_every_stage():
+    head = {'authors': [{'full_name': 'Smith, J.'}], 'core': True}
+    update = {'authors': [{'full_name': 'Smith, John'}], 'core': False}
+    calls = []
+    instrumentation = MergeInstrumentation(
+        callback=lambda *args: calls.append(args)
+    )
+
+    result = merge(
+        {},
+        head,
+        update,
+        configuration=PublisherOnArxivOperations,
+        instrumentation=instrumentation,
+    )
+
+    expected_stages = (
+        ['get_configuration']
+        + [
+            'pre_filters.%s' % get_filter_name(filter_)
+            for filter_ in PublisherOnArxivOperations.pre_filters
+        ]
+        + ['pre_filters', 'merge', 'filter_conflicts', 'postprocess']
+    )
+
+    assert result == merge({}, head, update, configuration=PublisherOnArxivOperations)
+    assert [stage[0] for stage in instrumentation.stages] == expected_stages
+    assert all(stage[1] >= 0 for stage in instrumentation.stages)
+    assert calls == instrumentation.stages
+
+
+def test_get_filter_name():
+    assert get_filter_name(filter_curated_references) == 'filter_curated_references'
+    assert (
+        get_filter_name(filter_documents_same_source)
+        == 'keep_only_update_source_in_field(documents)'
+    )
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import json
+
+from six import StringIO
+
+from inspire_json_merger.__main__ import main
+from inspire_json_merger.api import merge
+
+
+def test_main_merges_json_lines():
+    head = {'titles': [{'title': 'Superconductivity'}]}
+    update = {'titles': [{'title': 'Superconductivity'}], 'core': True}
+    stdin = StringIO(
+        json.dumps({'root': {}, 'head': head, 'update': update})
+        + '\n\n'
+        + json.dumps({'head': update, 'update': head})
+        + '\n'
+    )
+    stdout = StringIO()
+
+    exit_code = main([], stdin=stdin, stdout=stdout)
+
+    lines = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    expected = [merge({}, head, update), merge({}, update, head)]
+    assert exit_code == 0
+    assert [(line['merged'], line['conflicts']) for line in lines] == expected
+
+
+def test_main_reports_failed_merges():
+    stdin = StringIO(json.dumps({'head': None, 'update': {}}) + '\n')
+    stdout = StringIO()
+
+    exit_code = main(['--workers', '2'], stdin=stdin, stdout=stdout)
+
+    assert exit_code == 1
+    assert json.loads(stdout.getvalue())['error'].startswith('TypeError: ')
+
+
+def test_main_reports_invalid_lines_and_goes_on():
+    head = {'titles': [{'title': 'Superconductivity'}]}
+    update = {'titles': [{'title': 'Superconductivity'}], 'core': True}
+    stdin = StringIO(
+        '{"head": \n'
+        + json.dumps({'head': head, 'update': update})
+        + '\n'
+        + json.dumps({'head': head})
+        + '\n[]\n'
+        + json.dumps({'head': update, 'update': head})
+        + '\n'
+    )
+    stdout = StringIO()
+
+    exit_code = main(['--workers', '2'], stdin=stdin, stdout=stdout)
+
+    lines = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert exit_code == 1
+    assert len(lines) == 5
+    assert lines[0]['error'].startswith('ValueError: invalid input line 1: ')
+    assert (lines[1]['merged'], lines[1]['conflicts']) == merge({}, head, update)
+    assert lines[2]['error'] == (
+        "ValueError: invalid input line 3: KeyError: 'update'"
+    )
+    assert lines[3]['error'].startswith('ValueError: invalid input line 4: ')
+    assert (lines[4]['merged'], lines[4]['conflicts']) == merge({}, update, head)
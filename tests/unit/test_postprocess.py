@@ -21,10 +21,24 @@
 # or submit itself to any jurisdiction.
 from __future__ import absolute_import, division, print_function
 
+import itertools
+import json
+
+from json_merger.conflict import Conflict
+from pyrsistent import freeze
+
 from inspire_json_merger.postprocess import (
+    ConflictPositions,
+    OrderKeyIndex,
     _additem,
     _insert_to_list,
     _process_author_manual_merge_conflict,
+    add_conflict,
+    flatten_conflicts,
+    postprocess_conflicts,
+    postprocess_results,
+    remove_ordering_from_authors_merged,
+    update_conflicts_list,
 )
 from inspire_json_merger.utils import ORDER_KEY
 
@@ -144,6 +158,47 @@ def test_insert_to_list_when_position_exceeds_lists_elements_count():
     assert merged_objects_list == expected_merged
 
 
+def test_order_key_index_inserts_like_insert_to_list():
+    objects_list = [
+        {"full_name": "First", ORDER_KEY: 0},
+        {"full_name": "No position"},
+        {"full_name": "Third", ORDER_KEY: 4},
+        {"full_name": "Fourth", ORDER_KEY: 2},
+        {"full_name": "Fifth", ORDER_KEY: 6},
+    ]
+    expected_list = [dict(obj) for obj in objects_list]
+    index = OrderKeyIndex(objects_list, block_size=2)
+
+    for item, position in [
+        ({"full_name": "A", ORDER_KEY: 3}, None),
+        ({"full_name": "B"}, 1),
+        ({"full_name": "C", ORDER_KEY: 0}, None),
+        ({"full_name": "D"}, None),
+        ({"full_name": "E", ORDER_KEY: 5}, 2),
+        ({"full_name": "F", ORDER_KEY: 1}, None),
+    ]:
+        expected = _insert_to_list(item, expected_list, position)
+        assert index.insert(item, position) == expected
+
+    assert objects_list == expected_list
+
+
+def test_order_key_index_membership_follows_insertions():
+    objects_list = [
+        {"full_name": "First", ORDER_KEY: 0},
+        {"full_name": "Second", ORDER_KEY: 2},
+    ]
+    index = OrderKeyIndex(objects_list)
+
+    assert freeze({"full_name": "Second", ORDER_KEY: 2}) in index
+    assert {"full_name": "Third", ORDER_KEY: 1} not in index
+
+    index.insert({"full_name": "Third", ORDER_KEY: 1})
+
+    assert {"full_name": "Third", ORDER_KEY: 1} in index
+    assert {"full_name": "Third", ORDER_KEY: 2} not in index
+
+
 def test_add_item_on_position():
     item = {"path": "new"}
     object = {"some": [{"path": "1"}, {"path": "2"}, {"path": "3"}]}
@@ -295,3 +350,176 @@ def test_process_author_manual_merge_conflict_when_head_in_conflict_is_none():
     output = _process_author_manual_merge_conflict(conflict, merged)
 
     assert output == expected_output
+
+
+def test_conflict_positions_shift_conflicts_after_insertions():
+    positions = ConflictPositions()
+    set_first = Conflict('SET_FIELD', ('authors', 0, 'full_name'), 'first')
+    set_second = Conflict('SET_FIELD', ('authors', 1, 'full_name'), 'second')
+    set_title = Conflict('SET_FIELD', ('titles', 1, 'title'), 'title')
+    records = [positions.track(c) for c in (set_first, set_second, set_title)]
+    inserted = Conflict('REMOVE_FIELD', ('authors', 1), None)
+    records.append(positions.insert(inserted))
+    inserted_before = Conflict('REMOVE_FIELD', ('authors', 0), None)
+    records.append(positions.insert(inserted_before))
+
+    expected = [
+        Conflict('SET_FIELD', ('authors', 1, 'full_name'), 'first'),
+        Conflict('SET_FIELD', ('authors', 3, 'full_name'), 'second'),
+        set_title,
+        Conflict('REMOVE_FIELD', ('authors', 2), None),
+        inserted_before,
+    ]
+
+    assert positions.current(records[1]) == expected[1]
+    assert positions.resolve(records) is records
+    assert [record.to_conflict() for record in records] == expected
+    assert [tuple(record) for record in records] == expected
+    assert records[2].to_conflict() is set_title
+
+
+def test_add_conflict_shifts_positions_of_other_conflicts():
+    processed = [
+        Conflict('SET_FIELD', ('authors', 0, 'full_name'), 'first'),
+        Conflict('SET_FIELD', ('authors', 2, 'full_name'), 'third'),
+    ]
+    unprocessed = [
+        Conflict('SET_FIELD', ('authors', 1), {'full_name': 'second'}),
+        Conflict('ADD_BACK_TO_HEAD', ('authors',), {'full_name': 'fourth'}),
+        Conflict('SET_FIELD', ('titles', 1, 'title'), 'title'),
+    ]
+    conflict = Conflict('REMOVE_FIELD', ('authors', 1), None)
+
+    expected_processed = [
+        Conflict('SET_FIELD', ('authors', 0, 'full_name'), 'first'),
+        Conflict('SET_FIELD', ('authors', 3, 'full_name'), 'third'),
+        conflict,
+    ]
+    expected_unprocessed = [
+        Conflict('SET_FIELD', ('authors', 2), {'full_name': 'second'}),
+        Conflict('ADD_BACK_TO_HEAD', ('authors',), {'full_name': 'fourth'}),
+        Conflict('SET_FIELD', ('titles', 1, 'title'), 'title'),
+    ]
+
+    result = add_conflict(conflict, processed, unprocessed)
+
+    assert result == (expected_processed, expected_unprocessed)
+    assert result[0] is processed
+    assert update_conflicts_list(conflict, []) == []
+
+
+def test_postprocess_conflicts_updates_positions_of_other_conflicts():
+    merged = {
+        'authors': [
+            {'full_name': 'Janeway, Kathryn', ORDER_KEY: 0},
+            {'full_name': 'Archer, Jonathan', ORDER_KEY: 2},
+        ]
+    }
+    head_author = {'full_name': 'Picard, Jean-Luc', ORDER_KEY: 1}
+    conflicts = [
+        Conflict('SET_FIELD', ('authors', 1, 'full_name'), 'Archer, J.'),
+        Conflict(
+            'MANUAL_MERGE',
+            ('authors',),
+            (None, head_author, {'full_name': 'Picard, J.'}),
+        ),
+        Conflict('ADD_BACK_TO_HEAD', ('authors',), head_author),
+    ]
+
+    expected_conflicts = [
+        Conflict('SET_FIELD', ('authors', 2, 'full_name'), 'Archer, J.'),
+        Conflict('SET_FIELD', ('authors', 1), {'full_name': 'Picard, J.'}),
+    ]
+
+    result_conflicts, result_merged = postprocess_conflicts(conflicts, merged)
+
+    assert result_conflicts == expected_conflicts
+    assert result_merged['authors'][1] == head_author
+
+
+def test_postprocess_conflicts_skips_manual_merge_of_merged_head_authors():
+    merged = {
+        'authors': [
+            {'full_name': 'Janeway, Kathryn', ORDER_KEY: 0},
+            {'full_name': 'Archer, Jonathan', ORDER_KEY: 2},
+        ]
+    }
+    merged_author = freeze({'full_name': 'Archer, Jonathan', ORDER_KEY: 2})
+    head_author = freeze({'full_name': 'Picard, Jean-Luc', ORDER_KEY: 1})
+    conflicts = [
+        Conflict('MANUAL_MERGE', ('authors',), (None, merged_author, None)),
+        Conflict(
+            'MANUAL_MERGE',
+            ('authors',),
+            (None, head_author, {'full_name': 'Picard, J.'}),
+        ),
+    ]
+
+    expected_authors = [
+        {'full_name': 'Janeway, Kathryn', ORDER_KEY: 0},
+        {'full_name': 'Picard, Jean-Luc', ORDER_KEY: 1},
+        {'full_name': 'Archer, Jonathan', ORDER_KEY: 2},
+    ]
+    expected_conflicts = [
+        Conflict('SET_FIELD', ('authors', 1), {'full_name': 'Picard, J.'}),
+    ]
+
+    result_conflicts, result_merged = postprocess_conflicts(conflicts, merged)
+
+    assert result_conflicts == expected_conflicts
+    assert result_merged['authors'] == expected_authors
+
+
+def test_remove_ordering_from_authors_merged_does_not_copy_authors():
+    author = {'full_name': 'Janeway, Kathryn', ORDER_KEY: 0}
+    merged = {'authors': [author, {'full_name': 'Sisko, Benjamin'}]}
+
+    result = remove_ordering_from_authors_merged(merged)
+
+    assert result['authors'][0] is author
+    assert result['authors'] == [
+        {'full_name': 'Janeway, Kathryn'},
+        {'full_name': 'Sisko, Benjamin'},
+    ]
+
+
+def test_flatten_conflicts_is_like_to_json():
+    conflicts = [
+        Conflict('SET_FIELD', ('authors', 0, 'full_name'), u'Ortín, Tomás'),
+        Conflict('SET_FIELD', ('keywords',), [{'value': 'a'}, {'value': 'b'}]),
+        Conflict('REMOVE_FIELD', ('dois', 1), None),
+        Conflict('REORDER', ('titles',), None),
+        Conflict('INSERT', ('titles', 0), {'title': 'a', 'subtitle': ['b']}),
+        Conflict('ADD_BACK_TO_HEAD', ('authors',), {'full_name': 'Kirk, James'}),
+        Conflict(
+            'MANUAL_MERGE',
+            ('references', 0),
+            ({'reference': {}}, None, {'reference': {'title': {'title': 'a'}}}),
+        ),
+    ]
+
+    expected = list(
+        itertools.chain.from_iterable(json.loads(c.to_json()) for c in conflicts)
+    )
+
+    assert list(flatten_conflicts(conflicts)) == expected
+
+
+def test_postprocess_results_lazy():
+    conflicts = [
+        Conflict('SET_FIELD', ('authors', 0), {'full_name': 'Kirk', ORDER_KEY: 0}),
+    ]
+
+    expected = [
+        {
+            'path': '/authors/0',
+            'op': 'replace',
+            'value': {'full_name': 'Kirk'},
+            '$type': 'SET_FIELD',
+        }
+    ]
+
+    merged, result = postprocess_results({}, conflicts, lazy=True)
+
+    assert not isinstance(result, list)
+    assert list(result) == expected
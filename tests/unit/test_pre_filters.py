@@ -22,16 +22,23 @@
 
 from __future__ import absolute_import, division, print_function
 
+import pytest
+from pyrsistent import freeze
+
+from inspire_json_merger import config
 from inspire_json_merger.pre_filters import (
+    are_references_curated,
     clean_root_for_acquisition_source,
     filter_curated_references,
     filter_documents_same_source,
     filter_figures_same_source,
     filter_publisher_references,
+    get_reference_fingerprint,
+    get_references_fingerprints,
     remove_root,
     update_material,
 )
-from inspire_json_merger.utils import filter_records
+from inspire_json_merger.utils import filter_records, get_filters_fields
 
 
 def test_filter_documents_same_source():
@@ -445,6 +452,40 @@ def test_filter_curated_references_keeps_head_if_differs_from_root():
     assert result == expected
 
 
+def test_reference_fingerprint_ignores_fields_not_relevant_to_curation():
+    reference = {'reference': {'arxiv_eprint': '1810.12345'}}
+    almost_equal = {
+        'record': {'$ref': 'https://inspirehep.net/api/literature/1'},
+        'curated_relation': False,
+        'raw_refs': [{'schema': 'text', 'value': 'foo 1810.12345'}],
+        'reference': {
+            'arxiv_eprint': '1810.12345',
+            'misc': ['foo'],
+            'authors': [{'full_name': 'Smith, J.'}],
+        },
+    }
+    curated = dict(reference, curated_relation=True)
+
+    fingerprint = get_reference_fingerprint(reference)
+
+    assert get_reference_fingerprint(almost_equal) == fingerprint
+    assert get_reference_fingerprint(freeze(almost_equal)) == fingerprint
+    assert get_reference_fingerprint({}) == get_reference_fingerprint(
+        {'reference': {'misc': ['foo']}}
+    )
+    assert get_reference_fingerprint(curated) != fingerprint
+
+
+def test_are_references_curated_with_precomputed_root_fingerprints():
+    root_refs = [{'reference': {'arxiv_eprint': '1810.12345'}}]
+    head_refs = [{'reference': {'arxiv_eprint': '1810.12345', 'misc': ['foo']}}]
+    curated_refs = [{'reference': {'arxiv_eprint': '1810.56789'}}]
+    fingerprints = get_references_fingerprints(root_refs)
+
+    assert not are_references_curated(root_refs, head_refs, fingerprints)
+    assert are_references_curated(root_refs, curated_refs, fingerprints)
+
+
 def test_filter_publisher_references_keeps_head():
     root = {}
     head = {
@@ -772,3 +813,35 @@ def test_remove_root():
     assert root == {}
     assert head == head
     assert root == root
+
+
+@pytest.mark.parametrize(
+    'configuration',
+    [
+        config.ArxivOnArxivOperations,
+        config.ArxivOnPublisherOperations,
+        config.ErratumOnPublisherOperations,
+        config.GrobidOnArxivAuthorsOperations,
+        config.ManualMergeOperations,
+        config.PublisherOnArxivOperations,
+        config.PublisherOnPublisherOperations,
+    ],
+)
+def test_all_configured_pre_filters_declare_their_fields(configuration):
+    assert get_filters_fields(configuration.pre_filters) is not None
+
+
+def test_filter_records_only_converts_declared_fields():
+    authors = [{'full_name': 'Smith, J.'}]
+    root = {'authors': authors, 'references': [{'reference': {'title': 'a'}}]}
+    head = {'authors': authors, 'references': [{'reference': {'title': 'b'}}]}
+    update = {'authors': authors, 'references': [{'reference': {'title': 'c'}}]}
+
+    def undeclared_filter(*records):
+        return filter_curated_references(*records)
+
+    result = filter_records(root, head, update, filters=[filter_curated_references])
+    expected = filter_records(root, head, update, filters=[undeclared_filter])
+
+    assert result == expected
+    assert all(record['authors'] is authors for record in result)